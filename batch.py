@@ -0,0 +1,170 @@
+'''
+Runs normalization jobs from spec files without asking for any input, and writes the results as JSON lines\n
+A spec file is either a .json file holding one job or a list of jobs, or a .jsonl file with one job per line.
+Each job looks like this (only csv and form are required):\n
+    {
+        "id": "students",
+        "csv": "example.csv",
+        "form": 4,
+        "primary_key": ["StudentID", "Course", "Professor"],
+        "functional_dependencies": [[["StudentID"], ["FirstName", "LastName"]], ...],
+        "multivalue_dependencies": [["Course", "Professor"], ...],
+        "synthesize_3nf": false,
+        "columnar": false,
+        "verify": false,
+        "profile": false,
+        "include_rows": false
+    }\n
+If primary_key is left out, the first candidate key found is used, and csv paths are relative to the current directory\n
+Every job is run in this one process (or in each of --workers processes), so imports and caches are only set up once\n
+Usage: python batch.py jobs.jsonl [more spec files] --output results.jsonl --workers 4
+'''
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import sys
+import time
+from typing import Iterator
+
+import csv_parser
+import instrumentation
+import main
+import table
+import verifier
+
+def read_jobs(spec_file_location: str) -> 'Iterator[dict | RuntimeError]':
+    '''
+    This yields the jobs in a .json or .jsonl spec file\n
+    A line of a .jsonl file that is not valid JSON is yielded as a RuntimeError saying which line it was,
+    so run_job reports it as a failed job and the jobs on the lines after it still run
+    '''
+    with open(spec_file_location, "r") as spec_file:
+        if spec_file_location.endswith(".jsonl"):
+            for line_number, line in enumerate(spec_file, start=1):
+                if line.strip() == "":
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as err:
+                    yield RuntimeError(f"Line {line_number} of {spec_file_location} is not valid JSON: {err}")
+            return
+        specs = json.load(spec_file)
+    if isinstance(specs, dict):
+        specs = [specs]
+    yield from specs
+
+def build_table(job: dict) -> table.Table:
+    '''
+    This reads the csv of a job into a table and sets its dependencies and primary key from the job\n
+    Raises a RuntimeError if the job names a column the csv does not have
+    '''
+    with csv_parser.MappedCSV(job["csv"]) as mapped_csv:
+        my_table = table.Table(mapped_csv.columns, mapped_csv.iter_rows(), columnar=job.get("columnar", False))
+
+    funct_depends = job.get("functional_dependencies", [])
+    if len(funct_depends) != 0:
+        my_table.set_functional_dependencies(*[(det, dep) for det, dep in funct_depends])
+    multi_funct_depends = job.get("multivalue_dependencies", [])
+    if len(multi_funct_depends) != 0:
+        my_table.set_multivalue_funct_depends(*[(det, dep) for det, dep in multi_funct_depends])
+
+    if "primary_key" in job:
+        my_table.set_primary_key(job["primary_key"])
+    else:
+        my_table.primary_key = next(my_table.iter_candidate_keys())
+    return my_table
+
+def describe_table(my_table: table.Table, include_rows: bool = False) -> dict:
+    '''
+    This returns a table as a dict of plain JSON values, using column names instead of indexes
+    '''
+    names = my_table.columns
+    description = {
+        "columns": list(names),
+        "primary_key": [names[i] for i in my_table.primary_key],
+        "functional_dependencies": [
+            [[names[i] for i in det], [names[i] for i in dep]] for det, dep in my_table.funct_depends
+        ],
+        "multivalue_dependencies": [[names[det], names[dep]] for det, dep in my_table.multi_funct_depends],
+        "row_count": len(my_table.tuples),
+    }
+    if include_rows:
+        description["rows"] = [list(tup) for tup in my_table.tuples]
+    return description
+
+def run_job(job: 'dict | RuntimeError') -> dict:
+    '''
+    This runs one job and returns its result\n
+    Errors are caught and returned as the result instead of being raised, so one bad job does not stop the rest
+    '''
+    start = time.perf_counter()
+    result: dict = {"id": None}
+    try:
+        if isinstance(job, RuntimeError):
+            # read_jobs could not parse this one
+            raise job
+        if not isinstance(job, dict):
+            raise RuntimeError(f"A job has to be a JSON object, not {json.dumps(job)}")
+        result["id"] = job.get("id", job.get("csv"))
+        my_table = build_table(job)
+        verify = job.get("verify", False)
+        table_list = main.normalize_to_form(
+            my_table,
+            job["form"],
+            synthesize_3nf=job.get("synthesize_3nf", False),
+            verify=verify,
+            profile=job.get("profile", False),
+            verbose=False
+        )
+        result["status"] = "ok"
+        result["tables"] = [describe_table(new_table, job.get("include_rows", False)) for new_table in table_list]
+        if verify:
+            # normalize_to_form already raised if the join was lossy, so only preservation is left to report
+            unpreserved = verifier.get_unpreserved_dependencies(my_table, table_list)
+            result["unpreserved_dependencies"] = [
+                [[my_table.columns[i] for i in det], [my_table.columns[i] for i in dep]] for det, dep in unpreserved
+            ]
+        if job.get("profile", False):
+            result["profile"] = instrumentation.get_report()
+    except Exception as err:
+        result["status"] = "error"
+        result["error"] = f"{type(err).__name__}: {err}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def run_jobs(jobs: 'Iterator[dict | RuntimeError]', workers: int = 1) -> Iterator[dict]:
+    '''
+    This yields the result of each job, in the same order as the jobs\n
+    If workers is more than 1 the jobs are spread over that many processes
+    '''
+    if workers <= 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Small batches of jobs per task keep the overhead of sending them to the workers down
+        yield from executor.map(run_job, jobs, chunksize=8)
+
+def main_batch() -> int:
+    parser = argparse.ArgumentParser(description="Normalize tables from JSON/JSONL job specs without any prompts")
+    parser.add_argument("specs", nargs="+", help=".json or .jsonl files with the jobs to run")
+    parser.add_argument("--output", help="file to write the JSON lines results to, stdout if not given")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to run jobs on")
+    args = parser.parse_args()
+
+    jobs = (job for spec in args.specs for job in read_jobs(spec))
+    output = open(args.output, "w") if args.output is not None else sys.stdout
+    failed = 0
+    try:
+        for result in run_jobs(jobs, args.workers):
+            if result["status"] != "ok":
+                failed += 1
+            output.write(json.dumps(result) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    # Any failed job makes the exit code 1, so pipelines notice
+    return 1 if failed != 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main_batch())
@@ -0,0 +1,5 @@
+'''
+Benchmarks for the key search and normalization code\n
+generator.py makes random tables with known dependencies, and run.py times the library on them.
+Run it from the root of the repo with: python -m benchmarks.run --help
+'''
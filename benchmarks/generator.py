@@ -0,0 +1,95 @@
+'''
+Generates random tables whose data follows a random set of functional dependencies
+'''
+import random
+import zlib
+
+import table
+
+def generate_funct_depends(
+    columns: int, 
+    fd_density: float, 
+    max_lhs_size: int, 
+    rng: random.Random
+    ) -> list[tuple[list[int], list[int]]]:
+    '''
+    This returns random FDs over the given number of columns\n
+    Each column after the first is a dependant with a chance of fd_density, with a determinant of 1 to max_lhs_size
+    columns that come before it. Dependants with the same determinant are merged into one FD\n
+    Determinants only ever use earlier columns, so the data generated for them can always satisfy every FD
+    '''
+    funct_depends: dict[tuple[int, ...], list[int]] = {}
+    for col in range(1, columns):
+        if rng.random() >= fd_density:
+            continue
+        lhs_size = rng.randint(1, min(max_lhs_size, col))
+        determinant = tuple(sorted(rng.sample(range(col), lhs_size)))
+        funct_depends.setdefault(determinant, []).append(col)
+    return [(list(det), dep) for det, dep in funct_depends.items()]
+
+def generate_multi_funct_depends(columns: int, mvd_count: int, rng: random.Random) -> list[tuple[int, int]]:
+    '''
+    This returns mvd_count random MVDs, as (determinant, dependant) pairs of different columns
+    '''
+    if columns < 2:
+        return []
+    return [tuple(rng.sample(range(columns), 2)) for _ in range(mvd_count)]
+
+def generate_rows(
+    columns: int, 
+    rows: int, 
+    funct_depends: list[tuple[list[int], list[int]]], 
+    domain_size: int, 
+    multivalue_rate: float, 
+    rng: random.Random
+    ) -> list[tuple[str, ...]]:
+    '''
+    This returns random rows where every FD holds\n
+    Free columns get a random value out of domain_size values, and each dependant is worked out from its determinant
+    values. multivalue_rate is the chance of a free cell holding two values separated by a space
+    '''
+    determinant_of: dict[int, list[int]] = {}
+    for det, dep in funct_depends:
+        for attr in dep:
+            determinant_of[attr] = det
+    
+    new_rows: list[tuple[str, ...]] = []
+    for _ in range(rows):
+        row: list[str] = []
+        for col in range(columns):
+            det = determinant_of.get(col)
+            if det is not None:
+                # Any function of the determinant works, crc32 is used over hash() since it is the same on every run
+                code = zlib.crc32(",".join(row[i] for i in det).encode()) % domain_size
+                row.append(f"c{col}v{code}")
+            elif rng.random() < multivalue_rate:
+                row.append(f"c{col}v{rng.randrange(domain_size)} c{col}v{rng.randrange(domain_size)}")
+            else:
+                row.append(f"c{col}v{rng.randrange(domain_size)}")
+        new_rows.append(tuple(row))
+    return new_rows
+
+def generate_table(
+    columns: int = 10,
+    rows: int = 1000,
+    fd_density: float = 0.5,
+    max_lhs_size: int = 2,
+    mvd_count: int = 0,
+    domain_size: int = 50,
+    multivalue_rate: float = 0.0,
+    columnar: bool = False,
+    seed: int = 0
+    ) -> table.Table:
+    '''
+    This returns a random table with FDs, MVDs and a primary key set, whose rows follow the FDs\n
+    The same arguments always give the same table
+    '''
+    rng = random.Random(seed)
+    funct_depends = generate_funct_depends(columns, fd_density, max_lhs_size, rng)
+    new_rows = generate_rows(columns, rows, funct_depends, domain_size, multivalue_rate, rng)
+    
+    new_table = table.Table([f"c{col}" for col in range(columns)], new_rows, columnar=columnar)
+    new_table.funct_depends = funct_depends
+    new_table.multi_funct_depends = generate_multi_funct_depends(columns, mvd_count, rng)
+    new_table.primary_key = next(new_table.iter_candidate_keys())
+    return new_table
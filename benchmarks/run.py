@@ -0,0 +1,145 @@
+'''
+Times the key search and normalization functions on generated tables, and writes the results as JSON\n
+Example, from the root of the repo:\n
+    python -m benchmarks.run --columns 8 12 16 --rows 2000 --output new.json --compare old.json\n
+With --compare, every timing is checked against the same benchmark in an earlier results file,
+and the exit code is 1 if any of them got slower by more than --threshold
+'''
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+import normalizer
+import table
+from benchmarks.generator import generate_table
+
+def bench_construct_table(my_table: table.Table) -> table.Table:
+    '''
+    Projects the table onto its first half of columns, with those columns as the key so no key search is done
+    '''
+    new_cols = list(range(max(1, len(my_table.columns) // 2)))
+    return normalizer.construct_table(my_table, new_cols, list(new_cols), [], [])
+
+# Every benchmark gets a freshly generated table, so nothing cached by an earlier run is reused
+BENCHMARKS: dict[str, Callable[[table.Table], object]] = {
+    "get_candidate_keys": lambda my_table: my_table.get_candidate_keys(),
+    "get_partial_dependencies": lambda my_table: my_table.get_partial_dependencies(),
+    "construct_table": bench_construct_table,
+    "first_normal_form": normalizer.first_normal_form,
+    "second_normal_form": normalizer.second_normal_form,
+    "third_normal_form": normalizer.third_normal_form,
+    "synthesize_third_normal_form": normalizer.synthesize_third_normal_form,
+    "boyce_codd_normal_form": normalizer.boyce_codd_normal_form,
+    "forth_normal_form": normalizer.forth_normal_form,
+}
+
+def time_benchmark(name: str, config: dict, repeat: int) -> dict[str, float]:
+    '''
+    This runs one benchmark repeat times on tables generated from config, and returns the best and mean times in seconds
+    '''
+    timings: list[float] = []
+    for _ in range(repeat):
+        my_table = generate_table(**config)
+        start = time.perf_counter()
+        BENCHMARKS[name](my_table)
+        timings.append(time.perf_counter() - start)
+    return {"best": min(timings), "mean": statistics.mean(timings)}
+
+def get_case_name(config: dict) -> str:
+    '''
+    This returns the name results are stored under for a generated table config, like "cols=12,rows=2000,..."
+    '''
+    return ",".join(f"{key}={value}" for key, value in config.items())
+
+def run(configs: list[dict], names: list[str], repeat: int) -> dict:
+    '''
+    This runs every named benchmark on every config, and returns the results ready to be written as JSON
+    '''
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    for config in configs:
+        case = get_case_name(config)
+        results[case] = {}
+        for name in names:
+            results[case][name] = time_benchmark(name, config, repeat)
+            print(f"{case} {name}: {results[case][name]['best']:.6f}s", file=sys.stderr)
+    return {
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    '''
+    This prints how each benchmark changed between two results, and returns the ones that got slower than threshold allows\n
+    Only the best times are compared, since those are the least noisy
+    '''
+    regressions: list[str] = []
+    for case, timings in new["results"].items():
+        old_timings = old["results"].get(case, {})
+        for name, timing in timings.items():
+            if name not in old_timings:
+                continue
+            old_best = old_timings[name]["best"]
+            ratio = timing["best"] / old_best if old_best > 0 else 1.0
+            flag = ""
+            if ratio > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{case} {name}")
+            print(f"{case} {name}: {old_best:.6f}s -> {timing['best']:.6f}s ({ratio:.2f}x){flag}")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time key search and normalization on generated tables")
+    parser.add_argument("--columns", type=int, nargs="+", default=[8, 12, 16], help="column counts to generate tables with")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000], help="row counts to generate tables with")
+    parser.add_argument("--fd-density", type=float, default=0.5, help="chance of each column being a dependant")
+    parser.add_argument("--max-lhs-size", type=int, default=2, help="largest determinant of a generated FD")
+    parser.add_argument("--mvds", type=int, default=0, help="number of MVDs to generate")
+    parser.add_argument("--domain-size", type=int, default=50, help="distinct values per column")
+    parser.add_argument("--multivalue-rate", type=float, default=0.0, help="chance of a free cell holding two values")
+    parser.add_argument("--columnar", action="store_true", help="use columnar tables")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="times to run each benchmark, the best is kept")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--output", help="file to write the JSON results to, stdout if not given")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args()
+
+    configs = [
+        {
+            "columns": columns,
+            "rows": rows,
+            "fd_density": args.fd_density,
+            "max_lhs_size": args.max_lhs_size,
+            "mvd_count": args.mvds,
+            "domain_size": args.domain_size,
+            "multivalue_rate": args.multivalue_rate,
+            "columnar": args.columnar,
+            "seed": args.seed,
+        }
+        for columns in args.columns for rows in args.rows
+    ]
+    results = run(configs, args.only, args.repeat)
+
+    if args.output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, "r") as old_file:
+            old = json.load(old_file)
+        regressions = compare(old, results, args.threshold)
+        if len(regressions) != 0:
+            print(f"{len(regressions)} benchmark(s) got slower than {args.threshold}x")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
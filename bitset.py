@@ -0,0 +1,53 @@
+'''
+Helper functions for representing sets of attributes as integer bitmasks\n
+Bit i of the mask is set when the attribute at index i of Table.columns is in the set,
+so subset, union and equality checks become single integer operations
+'''
+
+# An attribute set is just an int, this alias is only here to make signatures easier to read
+AttributeSet = int
+
+def to_bitset(attributes: 'list[int]') -> AttributeSet:
+    '''
+    This takes in a list of attribute indexes and returns them as a bitmask
+    '''
+    bits = 0
+    for attr in attributes:
+        bits |= 1 << attr
+    return bits
+
+def from_bitset(bits: AttributeSet) -> list[int]:
+    '''
+    This takes in a bitmask and returns the attribute indexes in it as a sorted list of ints
+    '''
+    attributes: list[int] = []
+    while bits:
+        # Pull off the lowest set bit each time, so we only loop once per attribute in the set
+        lowest = bits & -bits
+        attributes.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return attributes
+
+def full_bitset(width: int) -> AttributeSet:
+    '''
+    This returns a bitmask containing every attribute of a table with the given number of columns
+    '''
+    return (1 << width) - 1
+
+def has_attribute(bits: AttributeSet, attr: int) -> bool:
+    '''
+    This returns True if the attribute index is in the bitmask
+    '''
+    return (bits >> attr) & 1 == 1
+
+def is_subset(small: AttributeSet, big: AttributeSet) -> bool:
+    '''
+    This returns True if every attribute in small is also in big
+    '''
+    return small & ~big == 0
+
+def bitset_size(bits: AttributeSet) -> int:
+    '''
+    This returns the number of attributes in the bitmask
+    '''
+    return bits.bit_count()
@@ -0,0 +1,262 @@
+'''
+Columnar, dictionary encoded storage for the rows of a Table\n
+Every column is stored as an array of integer codes, plus a dictionary mapping each distinct value to its code,
+so a value that shows up a million times is only stored once\n
+NumPy is used for projections when it is installed, otherwise we fall back to plain python
+'''
+from array import array
+from itertools import product
+from typing import Iterator, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Type code for the code arrays, 'q' is a signed 64 bit int, which lines up with numpy.int64
+CODE_TYPE = "q"
+
+class ColumnStore:
+
+    def __init__(self, width: int):
+        # codes[col][row] is the code of the value in that cell, and values[col][code] turns it back into the value
+        self.codes: list[array] = [array(CODE_TYPE) for _ in range(width)]
+        self.dictionaries: list[dict[str, int]] = [{} for _ in range(width)]
+        self.values: list[list[str]] = [[] for _ in range(width)]
+        # Kept separately so that a store with no columns still knows how many rows it has
+        self.row_count: int = 0
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def encode(self, col: int, value: str) -> int:
+        '''
+        This returns the code for a value in a column, adding the value to the columns dictionary if it is new
+        '''
+        dictionary = self.dictionaries[col]
+        code = dictionary.get(value)
+        if code is None:
+            code = len(self.values[col])
+            dictionary[value] = code
+            self.values[col].append(value)
+        return code
+
+    def append(self, row: 'tuple[str]') -> None:
+        '''
+        This adds a row to the end of the store
+        '''
+        for col, value in enumerate(row):
+            self.codes[col].append(self.encode(col, value))
+        self.row_count += 1
+
+    def set_row(self, index: int, row: 'tuple[str]') -> None:
+        '''
+        This replaces the row at the index
+        '''
+        for col, value in enumerate(row):
+            self.codes[col][index] = self.encode(col, value)
+
+    def swap_remove(self, index: int) -> None:
+        '''
+        This removes the row at the index in O(1) by moving the last row into its spot
+        '''
+        for codes in self.codes:
+            codes[index] = codes[-1]
+            codes.pop()
+        self.row_count -= 1
+
+    def get_row(self, index: int) -> 'tuple[str]':
+        '''
+        This decodes and returns the row at the index
+        '''
+        return tuple(self.values[col][codes[index]] for col, codes in enumerate(self.codes))
+
+    def iter_code_rows(self) -> 'Iterator[tuple[int]]':
+        '''
+        This yields every row as a tuple of codes, without decoding them
+        '''
+        if len(self.codes) == 0:
+            return iter([()] * self.row_count)
+        return zip(*self.codes)
+
+    def __iter__(self) -> 'Iterator[tuple[str]]':
+        values = self.values
+        for code_row in self.iter_code_rows():
+            yield tuple(values[col][code] for col, code in enumerate(code_row))
+
+    def find_codes(self, row: 'tuple[str]') -> 'tuple[int] | None':
+        '''
+        This returns the codes for the values of a row, or None if any value is not in its columns dictionary
+        (meaning the row cannot be in the store)
+        '''
+        codes: list[int] = []
+        for col, value in enumerate(row):
+            code = self.dictionaries[col].get(value)
+            if code is None:
+                return None
+            codes.append(code)
+        return tuple(codes)
+
+    def project(self, col_indexes: list[int]) -> 'ColumnStore':
+        '''
+        This returns a new store holding only the given columns, with duplicate rows removed\n
+        Rows are kept in the order they first show up in, and the new store shares our dictionaries
+        '''
+        new_store = ColumnStore(0)
+        new_store.dictionaries = [self.dictionaries[col] for col in col_indexes]
+        new_store.values = [self.values[col] for col in col_indexes]
+
+        if len(col_indexes) == 0:
+            new_store.row_count = min(self.row_count, 1)
+            return new_store
+
+        if numpy is not None and self.row_count != 0:
+            # Stack the code columns into one 2D array and let numpy find the first row of each distinct code row
+            stacked = numpy.column_stack([
+                numpy.frombuffer(self.codes[col], dtype=numpy.int64) for col in col_indexes
+            ])
+            _, first_rows = numpy.unique(stacked, axis=0, return_index=True)
+            first_rows.sort()
+            distinct = stacked[first_rows]
+            new_store.codes = [array(CODE_TYPE, distinct[:, i].tobytes()) for i in range(len(col_indexes))]
+        else:
+            # dicts keep insertion order, so this dedups the code rows and keeps the first-seen order
+            distinct_rows = dict.fromkeys(zip(*(self.codes[col] for col in col_indexes)))
+            new_store.codes = [array(CODE_TYPE) for _ in col_indexes]
+            for code_row in distinct_rows:
+                for i, code in enumerate(code_row):
+                    new_store.codes[i].append(code)
+        new_store.row_count = len(new_store.codes[0])
+        return new_store
+
+    def get_multivalue_codes(self, col: int) -> set[int]:
+        '''
+        This returns the codes of the values in a column that hold more than one value (have a space in them)
+        '''
+        return {code for value, code in self.dictionaries[col].items() if " " in value}
+
+    def has_multivalue(self) -> bool:
+        '''
+        This returns True if any cell in the store holds a multivalued attribute\n
+        Only the dictionaries are searched for spaces, the code arrays are only checked for the few codes that have them
+        '''
+        for col, codes in enumerate(self.codes):
+            multivalue_codes = self.get_multivalue_codes(col)
+            if len(multivalue_codes) == 0 or len(codes) == 0:
+                continue
+            # The dictionaries can be shared with other stores, so we still need to see if the code is actually used here
+            if numpy is not None:
+                column = numpy.frombuffer(codes, dtype=numpy.int64)
+                if numpy.isin(column, numpy.fromiter(multivalue_codes, dtype=numpy.int64)).any():
+                    return True
+            elif any(code in multivalue_codes for code in codes):
+                return True
+        return False
+
+    def get_split_codes(self) -> 'dict[int, dict[int, list[int]]]':
+        '''
+        This returns, for each column with multivalued cells, a dict from the code of each multivalued value
+        to the codes of the single values it splits into (adding them to the dictionary if needed)
+        '''
+        split_codes: 'dict[int, dict[int, list[int]]]' = {}
+        for col in range(len(self.codes)):
+            multivalue_codes = self.get_multivalue_codes(col)
+            if len(multivalue_codes) == 0:
+                continue
+            split_codes[col] = {
+                code: [self.encode(col, value) for value in self.values[col][code].split()]
+                for code in multivalue_codes
+            }
+        return split_codes
+
+    def expand_multivalues(self) -> 'ColumnStore':
+        '''
+        This returns a new store with every multivalued cell split up, where a row with more than one
+        multivalued cell is expanded into every combination of their values\n
+        Columns without multivalued cells are copied over as whole code arrays, only the rows that need it are expanded one by one
+        '''
+        split_codes = self.get_split_codes()
+        new_store = ColumnStore(0)
+        new_store.dictionaries = self.dictionaries
+        new_store.values = self.values
+        if len(split_codes) == 0:
+            new_store.codes = [array(CODE_TYPE, codes) for codes in self.codes]
+            new_store.row_count = self.row_count
+            return new_store
+
+        if numpy is not None:
+            self.expand_multivalues_numpy(new_store, split_codes)
+        else:
+            new_store.codes = [array(CODE_TYPE) for _ in self.codes]
+            for code_row in self.iter_code_rows():
+                options = [
+                    split_codes[col].get(code, (code,)) if col in split_codes else (code,)
+                    for col, code in enumerate(code_row)
+                ]
+                for new_row in product(*options):
+                    for col, code in enumerate(new_row):
+                        new_store.codes[col].append(code)
+        new_store.row_count = len(new_store.codes[0])
+        return new_store
+
+    def expand_multivalues_numpy(self, new_store: 'ColumnStore', split_codes: 'dict[int, dict[int, list[int]]]') -> None:
+        '''
+        Helper for expand_multivalues, fills in the codes of new_store using numpy\n
+        Every row is repeated once per combination of its values, then only the multivalued cells are overwritten
+        '''
+        columns = [numpy.frombuffer(codes, dtype=numpy.int64) for codes in self.codes]
+        # How many rows each row turns into, and which rows have anything to split at all
+        counts = numpy.ones(self.row_count, dtype=numpy.int64)
+        needs_expanding = numpy.zeros(self.row_count, dtype=bool)
+        for col, splits in split_codes.items():
+            sizes = numpy.ones(len(self.values[col]), dtype=numpy.int64)
+            for code, parts in splits.items():
+                sizes[code] = len(parts)
+            counts *= sizes[columns[col]]
+            needs_expanding |= numpy.isin(columns[col], numpy.fromiter(splits.keys(), dtype=numpy.int64))
+
+        new_columns = [numpy.repeat(column, counts) for column in columns]
+        offsets = numpy.cumsum(counts) - counts
+        multivalue_cols = list(split_codes.keys())
+        for row in numpy.nonzero(needs_expanding)[0]:
+            options = [split_codes[col].get(int(columns[col][row]), (int(columns[col][row]),)) for col in multivalue_cols]
+            for i, combination in enumerate(product(*options)):
+                for col, code in zip(multivalue_cols, combination):
+                    new_columns[col][offsets[row] + i] = code
+        new_store.codes = [array(CODE_TYPE, column.tobytes()) for column in new_columns]
+
+class TupleView(Sequence):
+    '''
+    A read only, list-like view of the rows in a ColumnStore\n
+    Rows are decoded back into tuples of strings only when they are read
+    '''
+
+    def __init__(self, store: ColumnStore):
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.get_row(i) for i in range(*index.indices(len(self.store)))]
+        if index < 0:
+            index += len(self.store)
+        if not (0 <= index < len(self.store)):
+            raise IndexError("row index out of range")
+        return self.store.get_row(index)
+
+    def __iter__(self) -> 'Iterator[tuple[str]]':
+        return iter(self.store)
+
+    def __contains__(self, row) -> bool:
+        codes = self.store.find_codes(row)
+        if codes is None or len(codes) != len(self.store.codes):
+            return False
+        return any(code_row == codes for code_row in self.store.iter_code_rows())
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
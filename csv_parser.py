@@ -1,24 +1,296 @@
-def parse_csv(csv_file_location: str) -> tuple[list[str], list[tuple]]:
+from array import array
+from itertools import accumulate, count
+import mmap
+from operator import add
+import os
+from typing import Iterator, Sequence
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Byte values MappedCSV looks for while scanning rows with quotes in them
+QUOTE = ord('"')
+COMMA = ord(",")
+NEWLINE = ord("\n")
+# How many bytes of the file are split into lines at a time while indexing it without numpy
+CHUNK_SIZE = 1 << 24
+
+def parse_line(line: str) -> tuple[str, ...]:
+    '''
+    This takes in one line of the csv file and returns its values as a tuple, split by commas
+    '''
+    # We strip leading and trailing whitespace and convert the list into a tuple
+    return tuple([str.strip(item) for item in line.split(",")])
+
+def read_columns(csv_file_location: str) -> list[str]:
+    '''
+    This reads only the first line of the csv file and returns the column names in it
+    '''
     with open(csv_file_location, "r") as csv:
-        columns = csv.readline().split(",")
-        # We strip leading and trailing whitespace
-        columns = [str.strip(item) for item in columns]
-        
-        tuples = []
-        while csv:
-            # Check if line is empty, and stop the loop if it is
-            line = csv.readline()
-            if not line:
-                break
-            
-            # We convert the line to a list, split by commas
-            entry = line.split(",")
-            # We strip leading and trailing whitespace and convert the list into a tuple
-            entry = tuple([str.strip(item) for item in entry])
+        return list(parse_line(csv.readline()))
+
+def iter_csv(csv_file_location: str, batch_size: int = 1024) -> Iterator[list[tuple]]:
+    '''
+    This reads the rows of the csv file (skipping the column names) and yields them in lists of up to batch_size tuples\n
+    Only one batch is held in memory at a time, so this works on files too big to load all at once\n
+    Raises a RuntimeError if a row does not have the same number of values as there are columns
+    '''
+    with open(csv_file_location, "r") as csv:
+        columns = parse_line(csv.readline())
+
+        batch: list[tuple] = []
+        for line in csv:
+            entry = parse_line(line)
             # Check if the number of entries in the tuple is not equal with the number of columns
             if len(entry) != len(columns):
                 raise RuntimeError(f"Items in {entry} not equal to number of columns ({len(columns)})")
-            # Append the tuple to the list of tuples
-            tuples.append(entry)
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if len(batch) != 0:
+            yield batch
+
+def iter_csv_rows(csv_file_location: str, batch_size: int = 1024) -> Iterator[tuple]:
+    '''
+    This yields the rows of the csv file one at a time, reading them in batches with iter_csv
+    '''
+    for batch in iter_csv(csv_file_location, batch_size):
+        yield from batch
+
+def parse_csv(csv_file_location: str) -> tuple[list[str], list[tuple]]:
+    '''
+    This reads the whole csv file and returns the column names and a list of every row
+    '''
+    columns = read_columns(csv_file_location)
+    tuples = list(iter_csv_rows(csv_file_location))
+    return (columns, tuples)
+
+class MappedCSV:
+    '''
+    A csv file read through a memory map, for files too big to turn into strings all at once\n
+    The byte offsets of every row and field are indexed once when the file is opened,
+    after that values are only decoded into strings when they are read, and only for the columns asked for\n
+    Fields can be wrapped in double quotes (to hold commas, newlines or "" for a quote),
+    and spaces inside a field are kept, so multivalued attributes work the same as with parse_csv\n
+    Raises a RuntimeError if the file is empty or a row does not have the same number of values as there are columns
+    '''
+    
+    def __init__(self, csv_file_location: str):
+        self.file = open(csv_file_location, "rb")
+        self.map: 'mmap.mmap | None' = None
+        try:
+            # mmap refuses to map an empty file, so we check for that first
+            if os.fstat(self.file.fileno()).st_size == 0:
+                raise RuntimeError(f"{csv_file_location} is empty")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self.map)
+            
+            header_bounds, position = self.scan_row(0)
+            self.columns: list[str] = [self.decode_field(header_bounds, i) for i in range(len(header_bounds) - 1)]
+            self.width = len(self.columns)
+            
+            # Every row takes up width + 1 entries: the start of each field, then one past the end of the last field
+            self.offsets = array("q")
+            self.row_count = 0
+            # Without any quotes every comma and newline is a delimiter, which lets us index in bulk
+            self.quoted = self.map.find(b'"', position) != -1
+            if self.quoted:
+                self.index_quoted_rows(position)
+            elif numpy is None or not self.index_plain_rows_numpy(position):
+                self.index_plain_rows(position)
+        except BaseException:
+            # Nobody gets a MappedCSV to close when this raises, so we close the file and map before passing it on
+            self.close()
+            raise
+    
+    def __len__(self) -> int:
+        return self.row_count
+    
+    def __enter__(self) -> 'MappedCSV':
+        return self
+    
+    def __exit__(self, *args) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        '''
+        This unmaps and closes the file, no rows can be read after this
+        '''
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+    
+    def check_row(self, bounds: 'Sequence[int]') -> None:
+        '''
+        Raises a RuntimeError if the row with these bounds does not have the same number of values as there are columns
+        '''
+        if len(bounds) - 1 != self.width:
+            entry = tuple(self.decode_field(bounds, i) for i in range(len(bounds) - 1))
+            raise RuntimeError(f"Items in {entry} not equal to number of columns ({self.width})")
+    
+    def index_quoted_rows(self, position: int) -> None:
+        '''
+        This indexes every row from position on, one row at a time
+        '''
+        while position < self.size:
+            bounds, position = self.scan_row(position)
+            self.check_row(bounds)
+            self.offsets.extend(bounds)
+            self.row_count += 1
+    
+    def index_plain_rows(self, position: int) -> None:
+        '''
+        This indexes every row from position on, for files without quotes, splitting the file into lines a chunk at a time
+        '''
+        while position < self.size:
+            chunk_end = self.size
+            if position + CHUNK_SIZE < self.size:
+                # End the chunk on a newline, going past CHUNK_SIZE only if a single line is longer than that
+                newline = self.map.rfind(b"\n", position, position + CHUNK_SIZE)
+                if newline == -1:
+                    newline = self.map.find(b"\n", position + CHUNK_SIZE)
+                if newline != -1:
+                    chunk_end = newline + 1
+            lines = self.map[position:chunk_end].split(b"\n")
+            if lines[-1] == b"":
+                # The chunk ended on a newline, that is not the start of another row
+                lines.pop()
+            offsets = self.offsets
+            for line in lines:
+                # The start of field k is the start of the row plus the lengths of the fields before it plus k commas
+                bounds = list(map(add, accumulate(map(len, line.split(b",")), initial=position), count()))
+                self.check_row(bounds)
+                offsets.extend(bounds)
+                position += len(line) + 1
+            self.row_count += len(lines)
+            position = chunk_end
+    
+    def index_plain_rows_numpy(self, position: int) -> bool:
+        '''
+        This indexes every row from position on, for files without quotes, finding every delimiter at once with numpy\n
+        Returns False without indexing anything if a row has the wrong number of values,
+        so the caller can index the slow way and raise the error with the row in it
+        '''
+        if position >= self.size:
+            return True
+        data = numpy.frombuffer(self.map, dtype=numpy.uint8, offset=position)
+        is_newline = data == NEWLINE
+        delimiters = numpy.flatnonzero(is_newline | (data == COMMA))
+        row_ends = is_newline[delimiters]
+        # The mmap cant be closed while numpy still points into it
+        del data, is_newline
+        delimiters += position
+        if len(row_ends) == 0 or not row_ends[-1]:
+            # The last row has no newline after it, so we pretend it ends just past the end of the file
+            delimiters = numpy.append(delimiters, self.size)
+            row_ends = numpy.append(row_ends, True)
+        if len(delimiters) % self.width != 0:
+            return False
+        # Every row has width - 1 commas then a newline, so the newlines have to land exactly every width delimiters
+        expected = numpy.zeros(len(delimiters), dtype=bool)
+        expected[self.width - 1::self.width] = True
+        if not numpy.array_equal(row_ends, expected):
+            return False
         
-        return (columns, tuples)
\ No newline at end of file
+        row_count = len(delimiters) // self.width
+        bounds = numpy.empty((row_count, self.width + 1), dtype=numpy.int64)
+        bounds[:, 1:] = delimiters.reshape(row_count, self.width) + 1
+        bounds[0, 0] = position
+        bounds[1:, 0] = bounds[:-1, self.width]
+        self.offsets = array("q", bounds.tobytes())
+        self.row_count = row_count
+        return True
+    
+    def scan_row(self, position: int) -> tuple[list[int], int]:
+        '''
+        This finds the fields of the row starting at position, and returns their bounds
+        (the start of each field, then one past the end of the last one) and where the next row starts
+        '''
+        end = self.map.find(b"\n", position)
+        if end == -1:
+            end = self.size
+        line = self.map[position:end]
+        if b'"' in line:
+            return self.scan_quoted_row(position)
+        bounds = list(map(add, accumulate(map(len, line.split(b",")), initial=position), count()))
+        return (bounds, end + 1)
+    
+    def scan_quoted_row(self, position: int) -> tuple[list[int], int]:
+        '''
+        This is scan_row for rows with quotes in them, where commas and newlines between quotes do not end anything
+        '''
+        data = self.map
+        bounds = [position]
+        in_quotes = False
+        i = position
+        while i < self.size:
+            char = data[i]
+            if in_quotes:
+                if char == QUOTE:
+                    if i + 1 < self.size and data[i + 1] == QUOTE:
+                        # "" inside quotes is an escaped quote
+                        i += 2
+                        continue
+                    in_quotes = False
+            elif char == QUOTE:
+                in_quotes = True
+            elif char == COMMA:
+                bounds.append(i + 1)
+            elif char == NEWLINE:
+                bounds.append(i + 1)
+                return (bounds, i + 1)
+            i += 1
+        bounds.append(self.size + 1)
+        return (bounds, self.size)
+    
+    def decode_field(self, bounds: 'Sequence[int]', index: int) -> str:
+        '''
+        This turns the field at the index of a row's bounds into a string, stripped and with its quotes removed
+        '''
+        value = self.map[bounds[index]:bounds[index + 1] - 1].decode("utf-8").strip()
+        if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+            value = value[1:-1].replace('""', '"')
+        return value
+    
+    def get_value(self, row: int, col: int) -> str:
+        '''
+        This returns the value in one cell of the file
+        '''
+        if not (0 <= row < self.row_count):
+            raise IndexError("row index out of range")
+        return self.decode_field(self.offsets, row * (self.width + 1) + col)
+    
+    def iter_rows(self, col_indexes: 'list[int] | None' = None) -> Iterator[tuple]:
+        '''
+        This yields the rows of the file (skipping the column names) as tuples of strings\n
+        If col_indexes is given, only those columns are decoded, in that order
+        '''
+        if col_indexes is None:
+            col_indexes = list(range(self.width))
+        stride = self.width + 1
+        offsets = self.offsets
+        if self.quoted:
+            for base in range(0, self.row_count * stride, stride):
+                yield tuple(self.decode_field(offsets, base + col) for col in col_indexes)
+            return
+        # Without quotes there is nothing to unquote, so we skip decode_field and slice the fields out directly
+        data = self.map
+        for base in range(0, self.row_count * stride, stride):
+            yield tuple(
+                data[offsets[base + col]:offsets[base + col + 1] - 1].decode("utf-8").strip() for col in col_indexes
+            )
+    
+    def iter_columns(self, column_names: list[str]) -> Iterator[tuple]:
+        '''
+        This yields the rows of the file with only the named columns in them, in the order they are named\n
+        Raises a RuntimeError if a column is not in the file
+        '''
+        col_indexes: list[int] = []
+        for name in column_names:
+            if not (name in self.columns):
+                raise RuntimeError(f"'{name}' is not a valid attribute")
+            col_indexes.append(self.columns.index(name))
+        return self.iter_rows(col_indexes)
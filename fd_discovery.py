@@ -0,0 +1,154 @@
+'''
+Discovery of functional dependencies from the data in a table, using the TANE algorithm\n
+Sets of attributes are searched level by level (all single attributes, then all pairs, ...),
+and each set is represented by a stripped partition of the rows (groups of row numbers that agree on the set,
+leaving out groups of one row), so checking a dependency never has to look at the values again\n
+See Huhtala et al., "TANE: An Efficient Algorithm for Discovering Functional and Approximate Dependencies"
+'''
+from typing import Hashable, Sequence
+
+from bitset import AttributeSet, from_bitset, full_bitset, is_subset
+
+# A stripped partition is a list of groups of row numbers, every group having at least two rows
+Partition = list[list[int]]
+
+def get_stripped_partition(column: 'Sequence[Hashable]') -> Partition:
+    '''
+    This takes in the values of one column and returns the stripped partition of the rows by those values
+    '''
+    groups: dict[Hashable, list[int]] = {}
+    for row, value in enumerate(column):
+        groups.setdefault(value, []).append(row)
+    return [group for group in groups.values() if len(group) > 1]
+
+def get_partition_error(partition: Partition) -> int:
+    '''
+    This returns how many rows would have to be removed for the partition to have no groups\n
+    X -> A holds exactly when the error of X is the same as the error of X + A
+    '''
+    return sum(len(group) for group in partition) - len(partition)
+
+def partition_product(first: Partition, second: Partition, row_owner: list[int]) -> Partition:
+    '''
+    This returns the stripped partition of the union of the two attribute sets the partitions are for\n
+    row_owner must be a list with a -1 for every row, it is used as scratch space and handed back filled with -1 again
+    '''
+    for group_index, group in enumerate(first):
+        for row in group:
+            row_owner[row] = group_index
+
+    product: Partition = []
+    pending: list[list[int]] = [[] for _ in first]
+    for group in second:
+        # Split the group up by which group of the first partition each row was in
+        for row in group:
+            group_index = row_owner[row]
+            if group_index != -1:
+                pending[group_index].append(row)
+        for row in group:
+            group_index = row_owner[row]
+            if group_index == -1:
+                continue
+            if len(pending[group_index]) > 1:
+                product.append(pending[group_index])
+            pending[group_index] = []
+
+    for group in first:
+        for row in group:
+            row_owner[row] = -1
+    return product
+
+def discover_functional_dependencies(
+    columns: 'list[Sequence[Hashable]]',
+    row_count: int,
+    max_lhs_size: 'int | None' = None
+    ) -> list[tuple[list[int], list[int]]]:
+    '''
+    This takes in the values of a table column by column, and returns every minimal, non-trivial functional dependency
+    that holds on them, in the same format as Table.funct_depends (dependencies with the same determinant are merged)\n
+    If max_lhs_size is given, only dependencies with at most that many determinant attributes are searched for
+    '''
+    width = len(columns)
+    all_attributes = full_bitset(width)
+    # found[A] holds the determinants of every minimal dependency X -> A found so far
+    found: list[list[AttributeSet]] = [[] for _ in range(width)]
+    found_order: list[tuple[AttributeSet, int]] = []
+
+    def add_dependency(det: AttributeSet, attr: int) -> None:
+        found[attr].append(det)
+        found_order.append((det, attr))
+
+    row_owner = [-1] * row_count
+    # Level 0 is just the empty set, every row agrees on it
+    empty_partition: Partition = [list(range(row_count))] if row_count > 1 else []
+    previous_errors: dict[AttributeSet, int] = {0: get_partition_error(empty_partition)}
+    previous_candidates: dict[AttributeSet, AttributeSet] = {0: all_attributes}
+
+    # Level 1 is every single attribute
+    level: dict[AttributeSet, Partition] = {
+        1 << attr: get_stripped_partition(columns[attr]) for attr in range(width)
+    }
+    level_size = 1
+    while len(level) != 0:
+        errors = {attr_set: get_partition_error(partition) for attr_set, partition in level.items()}
+
+        # Compute the right hand side candidates of each set, and output X - A -> A for the ones that hold
+        candidates: dict[AttributeSet, AttributeSet] = {}
+        for attr_set in level:
+            attr_candidates = all_attributes
+            for attr in from_bitset(attr_set):
+                attr_candidates &= previous_candidates[attr_set & ~(1 << attr)]
+            for attr in from_bitset(attr_set & attr_candidates):
+                det = attr_set & ~(1 << attr)
+                if previous_errors[det] != errors[attr_set]:
+                    continue
+                add_dependency(det, attr)
+                attr_candidates &= ~(1 << attr)
+                # X - A already describes A, so no minimal dependency can have X in its determinant
+                attr_candidates &= attr_set
+            candidates[attr_set] = attr_candidates
+
+        # Prune sets that cant lead to any more minimal dependencies
+        for attr_set in list(level):
+            if candidates[attr_set] == 0:
+                del level[attr_set]
+                continue
+            if errors[attr_set] != 0:
+                continue
+            # A (super)key describes everything, so every candidate outside of it is a dependency,
+            # as long as no smaller determinant already describes it
+            if max_lhs_size is None or level_size <= max_lhs_size:
+                for attr in from_bitset(candidates[attr_set] & ~attr_set):
+                    if not any(is_subset(det, attr_set) for det in found[attr]):
+                        add_dependency(attr_set, attr)
+            del level[attr_set]
+
+        if max_lhs_size is not None and level_size > max_lhs_size:
+            break
+
+        # Build the next level out of pairs of sets that only differ in their last attribute
+        blocks: dict[AttributeSet, list[AttributeSet]] = {}
+        for attr_set in level:
+            highest = 1 << (attr_set.bit_length() - 1)
+            blocks.setdefault(attr_set & ~highest, []).append(attr_set)
+        next_level: dict[AttributeSet, Partition] = {}
+        for block in blocks.values():
+            block.sort()
+            for i, first in enumerate(block):
+                for second in block[i + 1:]:
+                    new_set = first | second
+                    # Every subset one smaller has to have survived, otherwise the new set was pruned already
+                    if not all((new_set & ~(1 << attr)) in level for attr in from_bitset(new_set)):
+                        continue
+                    next_level[new_set] = partition_product(level[first], level[second], row_owner)
+
+        previous_errors = errors
+        previous_candidates = candidates
+        level = next_level
+        level_size += 1
+
+    # Merge dependencies with the same determinant, keeping the order they were found in
+    merged: dict[AttributeSet, list[int]] = {}
+    for det, attr in found_order:
+        merged.setdefault(det, []).append(attr)
+    return [(from_bitset(det), sorted(dep)) for det, dep in merged.items()]
@@ -0,0 +1,79 @@
+'''
+Counters and wall clock timers for finding out where a normalization run spends its time\n
+Everything is off unless enabled is set, and the hot paths check the flag before calling in here,
+so when it is off the only cost is reading one module attribute\n
+Counts and times are grouped by phase (like "Normalized to 3rd normal form"), set with the phase() context manager\n
+Only the current process is measured, so work done by the worker processes of normalize_to_form(workers=...) is not counted
+'''
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+enabled: bool = False
+current_phase: str = "other"
+# counters[phase][name] and timers[phase][name], times are in seconds
+counters: dict[str, dict[str, int]] = {}
+timers: dict[str, dict[str, float]] = {}
+
+def reset() -> None:
+    '''
+    This throws out every count and time recorded so far
+    '''
+    global current_phase
+    counters.clear()
+    timers.clear()
+    current_phase = "other"
+
+def count(name: str, amount: int = 1) -> None:
+    '''
+    This adds amount to a counter in the current phase\n
+    Callers should check enabled first, this does not
+    '''
+    phase_counters = counters.setdefault(current_phase, {})
+    phase_counters[name] = phase_counters.get(name, 0) + amount
+
+def add_time(name: str, seconds: float) -> None:
+    '''
+    This adds seconds to a timer in the current phase
+    '''
+    phase_timers = timers.setdefault(current_phase, {})
+    phase_timers[name] = phase_timers.get(name, 0.0) + seconds
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    '''
+    Everything counted or timed inside of this is recorded under the phase name
+    '''
+    global current_phase
+    previous_phase = current_phase
+    current_phase = name
+    try:
+        yield
+    finally:
+        current_phase = previous_phase
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    '''
+    This adds the time spent inside of it to a timer in the current phase, if instrumentation is enabled
+    '''
+    if not enabled:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, perf_counter() - start)
+
+def get_report() -> dict[str, dict[str, dict]]:
+    '''
+    This returns everything recorded, as {phase: {"counters": {...}, "timers": {...}}}, ready to be dumped as JSON
+    '''
+    report: dict[str, dict[str, dict]] = {}
+    for phase_name in list(counters) + [name for name in timers if name not in counters]:
+        report[phase_name] = {
+            "counters": dict(counters.get(phase_name, {})),
+            "timers": dict(timers.get(phase_name, {})),
+        }
+    return report
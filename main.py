@@ -1,6 +1,13 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import json
+
 import table
 import csv_parser
+import instrumentation
 import normalizer
+import sql_generator
+import verifier
 
 def input_funct_depends(my_table: table.Table) -> None:
     '''
@@ -13,7 +20,7 @@ def input_funct_depends(my_table: table.Table) -> None:
         counter += 1
     print(
         "Please input any valid functional dependencies, or hit enter if finished\n"
-        "Note: if there are any transitive FDs a->b,c and c->d, write them as a->b,c,d and c->d\n"
+        "Note: transitive FDs do not need to be written out, a->b,c and c->d is enough to get a->d\n"
         "Format: 0, 1 -> 2, 3"
     )
     done = False
@@ -115,6 +122,28 @@ def input_primary_key(my_table: table.Table) -> None:
         except IndexError as err:
             print(f"Something was wrong with your input: {err}")
             
+def check_dependencies(my_table: table.Table, max_violations: int = 10) -> None:
+    '''
+    This will take in a table and print any groups of tuples that break its functional or multivalue dependencies,
+    since normalizing on a dependency that does not hold loses data\n
+    The dependencies are checked on the table after its multivalued cells are split up (1NF), since that is what
+    they are normalized on, and the rows printed are rows of that expanded table
+    '''
+    if not normalizer.is_1nf(my_table):
+        my_table = normalizer.first_normal_form(my_table)[0]
+    violations = my_table.validate_dependencies(max_violations)
+    if len(violations) == 0:
+        return
+    print()
+    print(f"Warning: the data does not follow these dependencies (showing up to {max_violations}):")
+    for violation in violations:
+        arrow = "->" if violation.kind == "FD" else "->->"
+        print(f"{my_table.get_columns(violation.determinant)} {arrow} {my_table.get_columns(violation.dependant)}")
+        for row in violation.rows[:5]:
+            print(f"    row {row}: {my_table.tuples[row]}")
+        if len(violation.rows) > 5:
+            print(f"    ... and {len(violation.rows) - 5} more rows")
+
 def create_table() -> table.Table:
     '''
     This will prompt the user for a csv file, and return a table object with the data in the csv
@@ -123,11 +152,9 @@ def create_table() -> table.Table:
         print()
         csv = input("Please input a CSV file containing a single table: ")
         try:
-            parsed_csv = csv_parser.parse_csv(csv)
-            
-            csv_cols = parsed_csv[0]
-            csv_rows = parsed_csv[1]
-            return table.Table(csv_cols, csv_rows)
+            # The file is memory mapped, so each value is decoded straight from it into the table
+            with csv_parser.MappedCSV(csv) as mapped_csv:
+                return table.Table(mapped_csv.columns, mapped_csv.iter_rows())
         except FileNotFoundError as err:
             print(err)
         except RuntimeError as err:
@@ -153,48 +180,197 @@ def find_normal_form(my_table: table.Table) -> None:
     
     print("Highest normal form of the input table:", form)
             
-def normalize_to_form(start_table: table.Table, form: int) -> list[table.Table]:
+def get_form_title(form_counter: int, synthesize_3nf: bool = False) -> str:
+    '''
+    This returns the heading printed above the tables of a normalization level
+    '''
+    match form_counter:
+        case 1:
+            return "Normalized to 1st normal form"
+        case 2:
+            return "Normalized to 2nd normal form"
+        case 3 if synthesize_3nf:
+            return "Normalized to 3rd normal form (synthesized)"
+        case 3:
+            return "Normalized to 3rd normal form"
+        case 4:
+            return "Normalized to Boyce Codd normal form"
+        case 5:
+            return "Normalized to 4th normal form"
+        case 6:
+            return "Normalized to 5th normal form"
+        case _:
+            raise RuntimeError(f"What.")
+
+def normalize_table(my_table: table.Table, form_counter: int, synthesize_3nf: bool = False) -> list[table.Table]:
+    '''
+    This takes a table one level up, to the form given by form_counter, and returns the tables it was split into\n
+    This is a module level function so that worker processes can run it
+    '''
+    match form_counter:
+        case 1:
+            return normalizer.first_normal_form(my_table)
+        case 2:
+            return normalizer.second_normal_form(my_table)
+        case 3 if synthesize_3nf:
+            return normalizer.synthesize_third_normal_form(my_table)
+        case 3:
+            return normalizer.third_normal_form(my_table)
+        case 4:
+            return normalizer.boyce_codd_normal_form(my_table)
+        case 5:
+            return normalizer.forth_normal_form(my_table)
+        case 6:
+            return normalizer.fifth_normal_form(my_table)
+        case _:
+            raise RuntimeError(f"What.")
+
+def split_table(my_table: table.Table, form_counter: int) -> list[table.Table]:
+    '''
+    This does one step of the recursive BCNF (form_counter 4) or 4NF (form_counter 5) decomposition on a table
+    '''
+    if form_counter == 4:
+        return normalizer.boyce_codd_split(my_table)
+    return normalizer.forth_normal_form_split(my_table)
+
+def normalize_level_parallel(
+    executor: ProcessPoolExecutor, 
+    table_list: list[table.Table], 
+    form_counter: int, 
+    synthesize_3nf: bool = False
+    ) -> list[table.Table]:
+    '''
+    This normalizes every table in table_list one level up on the worker processes of executor,
+    and returns the new tables in the same order normalizing them one by one would\n
+    BCNF and 4NF decompositions are recursive, so they are run in rounds of single splits instead,
+    which lets the two halves of a split run on different workers
+    '''
+    if form_counter not in (4, 5):
+        new_table_list: list[table.Table] = []
+        for new_tables in executor.map(normalize_table, table_list, repeat(form_counter), repeat(synthesize_3nf)):
+            new_table_list += new_tables
+        return new_table_list
+    
+    # Each entry is a table and whether it is known to be fully decomposed
+    frontier: list[tuple[table.Table, bool]] = [(my_table, False) for my_table in table_list]
+    while not all(done for _, done in frontier):
+        unfinished = [my_table for my_table, done in frontier if not done]
+        splits = executor.map(split_table, unfinished, repeat(form_counter))
+        new_frontier: list[tuple[table.Table, bool]] = []
+        for my_table, done in frontier:
+            if done:
+                new_frontier.append((my_table, True))
+                continue
+            # The split tables take the place of the table they came from, which keeps the recursive order
+            split_tables = next(splits)
+            if len(split_tables) == 1:
+                new_frontier.append((split_tables[0], True))
+            else:
+                new_frontier += [(split, False) for split in split_tables]
+        frontier = new_frontier
+    return [my_table for my_table, _ in frontier]
+
+def verify_decomposition(
+    start_table: table.Table, 
+    table_list: list[table.Table], 
+    verbose: bool = True
+    ) -> None:
+    '''
+    This checks that table_list is a lossless join decomposition of start_table, raising a RuntimeError if it is not,
+    and prints any functional dependencies of start_table that the tables no longer preserve if verbose is set
+    '''
+    if not verifier.is_lossless_join(start_table, table_list):
+        raise RuntimeError("The normalized tables are not a lossless join decomposition of the original table")
+    if not verbose:
+        return
+    unpreserved = verifier.get_unpreserved_dependencies(start_table, table_list)
+    if len(unpreserved) != 0:
+        print()
+        print("Warning: these functional dependencies are not preserved by the normalized tables:")
+        for det, dep in unpreserved:
+            print(f"{start_table.get_columns(det)} -> {start_table.get_columns(dep)}")
+
+def normalize_to_form(
+    start_table: table.Table, 
+    form: int, 
+    use_minimal_cover: bool = True, 
+    synthesize_3nf: bool = False,
+    workers: int = 1,
+    verify: bool = False,
+    profile: bool = False,
+    verbose: bool = True,
+    print_intermediate: bool = True,
+    print_mode: str = "all",
+    print_limit: int = 20
+    ) -> list[table.Table]:
     '''
     This will take in a table object and a form as an int 1 -> 1st, 4 -> bc, 6 -> 5th\n
-    This outputs a list of tables normalized to the given form
+    This outputs a list of tables normalized to the given form\n
+    If use_minimal_cover is set, the tables are normalized on a minimal cover of the functional dependencies of start_table\n
+    start_table itself is never changed\n
+    If synthesize_3nf is set, 3NF tables are synthesized straight from the 1NF tables and the 2NF pass is skipped\n
+    If workers is more than 1, the tables of each level are normalized on a pool of that many processes,
+    the output is the same as normalizing them one by one\n
+    If verify is set, the output tables are checked to be a lossless join decomposition of start_table with the chase,
+    raising a RuntimeError if they are not, and any functional dependencies they no longer preserve are printed\n
+    If profile is set, closure calls, key search nodes, rows projected, tables produced and time spent are recorded
+    for each level (see instrumentation.py) and printed as JSON at the end\n
+    If verbose is not set, nothing is printed, for running without anyone watching (see batch.py)\n
+    If print_intermediate is not set, only the tables of the final form are printed, not those of each level on the way\n
+    print_mode and print_limit say which rows of each table are printed, see Table.print_table
     '''
-    form_counter = 0
-    table_list = [start_table]
-    while form_counter != form:
+    if profile:
+        was_enabled = instrumentation.enabled
+        instrumentation.reset()
+        instrumentation.enabled = True
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        table_list = [start_table]
+        if use_minimal_cover:
+            # We swap the cover into a copy, so the caller's table keeps the dependencies it was given
+            with instrumentation.phase("Minimal cover"), instrumentation.timer("minimal_cover"):
+                covered_table = start_table.copy_sharing_rows()
+                covered_table.funct_depends = start_table.minimal_cover()
+            table_list = [covered_table]
+        form_counter = 0
+        while form_counter != form:
+            form_counter += 1
+            if synthesize_3nf and form_counter == 2 and form >= 3:
+                # Synthesis does not need the tables to be in 2NF first, so we go straight to 3NF
+                continue
+            print_str = get_form_title(form_counter, synthesize_3nf)
+            with instrumentation.phase(print_str):
+                new_table_list: list[table.Table] = []
+                with instrumentation.timer("normalize"):
+                    if executor is None:
+                        for my_table in table_list:
+                            new_table_list += normalize_table(my_table, form_counter, synthesize_3nf)
+                    else:
+                        new_table_list = normalize_level_parallel(executor, table_list, form_counter, synthesize_3nf)
+                if instrumentation.enabled:
+                    instrumentation.count("tables_produced", len(new_table_list))
+                if verbose and (print_intermediate or form_counter == form):
+                    with instrumentation.timer("print_table"):
+                        print()
+                        print(f"-----====={print_str}=====-----")
+                        for new_table in new_table_list:
+                            print()
+                            new_table.print_table(print_mode, print_limit)
+                            new_table.print_primary_key()
+                            new_table.print_functional_dependencies()
+                            new_table.print_mvds()
+            table_list = new_table_list
+        if verify:
+            with instrumentation.phase("Verify"), instrumentation.timer("verify"):
+                verify_decomposition(start_table, table_list, verbose)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if profile:
+            instrumentation.enabled = was_enabled
+    if profile and verbose:
         print()
-        form_counter += 1
-        new_table_list: list[table.Table] = []
-        print_str = ""
-        for my_table in table_list:
-            match form_counter:
-                case 1:
-                    print_str = "Normalized to 1st normal form"
-                    new_table_list += normalizer.first_normal_form(my_table)
-                case 2:
-                    print_str = "Normalized to 2nd normal form"
-                    new_table_list += normalizer.second_normal_form(my_table)
-                case 3:
-                    print_str = "Normalized to 3rd normal form"
-                    new_table_list += normalizer.third_normal_form(my_table)
-                case 4:
-                    print_str = "Normalized to Boyce Codd normal form"
-                    new_table_list += normalizer.boyce_codd_normal_form(my_table)
-                case 5:
-                    print_str = "Normalized to 4th normal form"
-                    new_table_list += normalizer.forth_normal_form(my_table)
-                case 6:
-                    print_str = "Normalized to 5th normal form"
-                    new_table_list += normalizer.fifth_normal_form(my_table)
-                case _:
-                    raise RuntimeError(f"What.")
-        print(f"-----====={print_str}=====-----")
-        for new_table in new_table_list:
-            print()
-            new_table.print_table()
-            new_table.print_primary_key()
-            new_table.print_functional_dependencies()
-            new_table.print_mvds()
-        table_list = new_table_list
+        print(json.dumps(instrumentation.get_report(), indent=2))
     return table_list
 
 def main():
@@ -203,6 +379,7 @@ def main():
     input_funct_depends(my_table)
     input_primary_key(my_table)
     input_mvds(my_table)
+    check_dependencies(my_table)
     
     normal_form = int(input(
         "Please enter the form you would like to normalize to\n"
@@ -216,6 +393,7 @@ def main():
     ))
     
     find_highest_form = input("Find the highest form of the input table? (1: Yes, 2: No): ")
+    sql_file_location = input("File to write the SQL for the normalized tables to (hit enter to skip): ").strip()
     
     print("\n-----=====Original Table=====-----")
     my_table.print_table()
@@ -223,7 +401,12 @@ def main():
     my_table.print_functional_dependencies()
     my_table.print_mvds()
     
-    normalize_to_form(my_table, normal_form)
+    normalized_tables = normalize_to_form(my_table, normal_form)
+    
+    if sql_file_location != "":
+        with open(sql_file_location, "w") as sql_file:
+            sql_generator.write_sql(normalized_tables, sql_file)
+        print(f"\nWrote SQL for {len(normalized_tables)} tables to {sql_file_location}")
     
     if find_highest_form.strip() == "1":
         print()
@@ -1,13 +1,16 @@
+from itertools import product
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+import instrumentation
 import table
+from bitset import to_bitset, from_bitset, has_attribute, is_subset
 
 def construct_table_from_funct_dep(old_table: table.Table, funct_depend: tuple[list[int], list[int]]) -> table.Table:
     '''
     This takes in an old table and a functional dependancy
     and returns a new table containing all relevant mvds and functional dependencies
     '''
-    table_funct_depends: list[tuple[list[int], list[int]]] = []
-    if len(funct_depend[1]) != 0:
-        table_funct_depends.append(funct_depend)
     table_mvds: list[tuple[int, int]] = []
     table_columns: list[int] = []
 
@@ -19,31 +22,20 @@ def construct_table_from_funct_dep(old_table: table.Table, funct_depend: tuple[l
     
     # First, we find if any multivalued functional dependencies with all elements present in the new tables columns
     # And if we do, we add them to mvds
+    column_bits = to_bitset(table_columns)
     for attr in table_columns:
         mvd_dependant = old_table.get_mvd_dependants(attr)
         if len(mvd_dependant) == 0:
             continue
         for dep_attr in mvd_dependant:
-            if not dep_attr in table_columns:
+            if not has_attribute(column_bits, dep_attr):
                 continue
             new_mvd = (attr, dep_attr)
             table_mvds.append(new_mvd)
 
-    # Last, we need to find any transitive functional dependencies in our columns, and take them with us
-    for det, dep in old_table.funct_depends:
-        determinant_in_col = all(attr in table_columns for attr in det)
-        if determinant_in_col:
-            new_dependants: list[int] = []
-            for attr in dep:
-                if not (attr in table_columns):
-                    continue
-                new_dependants.append(attr)
-            if len(new_dependants) == 0:
-                continue
-            new_dependancy = (det, new_dependants)
-            if new_dependancy in table_funct_depends:
-                continue
-            table_funct_depends.append(new_dependancy)
+    # Last, we project the functional dependencies onto our columns
+    # This also takes the ones that only held through columns we left behind, like X -> Z from X -> Y -> Z without Y
+    table_funct_depends = old_table.project_funct_depends(table_columns)
 
     # Construct the table!
     new_table = construct_table(
@@ -61,36 +53,24 @@ def construct_table_from_cols(old_table: table.Table, table_columns: list[int])
     This takes in an old table and a list of columns
     and returns a new table containing all relevant mvds and functional dependencies
     '''
-    table_funct_depends: list[tuple[list[int], list[int]]] = []
     table_mvds: list[tuple[int, tuple[int, int]]] = []
     
     # First, we find if any multivalued functional dependencies with all elements present in the new tables columns
     # And if we do, we add them to mvds
+    column_bits = to_bitset(table_columns)
     for attr in table_columns:
         mvd_dependant = old_table.get_mvd_dependants(attr)
         if len(mvd_dependant) == 0:
             continue
         for dep_attr in mvd_dependant:
-            if not dep_attr in table_columns:
+            if not has_attribute(column_bits, dep_attr):
                 continue
             new_mvd = (attr, dep_attr)
             table_mvds.append(new_mvd)
 
-    # Last, we need to find any transitive functional dependencies in our columns, and take them with us
-    for det, dep in old_table.funct_depends:
-        determinant_in_col = all(attr in table_columns for attr in det)
-        if determinant_in_col:
-            new_dependants: list[int] = []
-            for attr in dep:
-                if not (attr in table_columns):
-                    continue
-                new_dependants.append(attr)
-            if len(new_dependants) == 0:
-                continue
-            new_dependancy = (det, new_dependants)
-            if new_dependancy in table_funct_depends:
-                continue
-            table_funct_depends.append(new_dependancy)
+    # Last, we project the functional dependencies onto our columns
+    # This also takes the ones that only held through columns we left behind, like X -> Z from X -> Y -> Z without Y
+    table_funct_depends = old_table.project_funct_depends(table_columns)
 
     # Construct the table!
     new_table = construct_table(
@@ -125,15 +105,15 @@ def construct_table(
     # Convert old indexes to new ones and construct the table with rows, the pk, fds, and mvds
     new_col_indexes.sort()
     new_columns = [old_table.columns[i] for i in new_col_indexes]
-    new_table = table.Table(new_columns)
+    new_table = table.Table(new_columns, columnar=old_table.is_columnar())
+    # Map each old index to its new one once, instead of searching the new columns for every attribute
+    index_map = get_index_map(new_col_indexes)
     for det, dep in functional_dependencies:
-        new_det = [convert_index(i, old_table.columns, new_table.columns) for i in det]
-        new_dep = [convert_index(i, old_table.columns, new_table.columns) for i in dep]
+        new_det = [index_map[i] for i in det]
+        new_dep = [index_map[i] for i in dep]
         new_table.funct_depends.append((new_det, new_dep))
     for det, dep in multivalue_attributes:
-        new_det = convert_index(det, old_table.columns, new_table.columns)
-        new_dep = convert_index(dep, old_table.columns, new_table.columns)
-        new_table.multi_funct_depends.append((new_det, new_dep))
+        new_table.multi_funct_depends.append((index_map[det], index_map[dep]))
     
     # Before we set the primary key, we check if we were given one, and if not, we must pick on
     if len(primary_key) == 0:
@@ -145,20 +125,68 @@ def construct_table(
                 )
         new_pk = candidate_keys[0]
     else:
-        new_pk = [convert_index(i, old_table.columns, new_table.columns) for i in primary_key]
+        new_pk = [index_map[i] for i in primary_key]
     new_table.primary_key = new_pk
 
     # Having constructed our new table, we now need to add all the tuples back into it
-    for tup in old_table.tuples:
-        new_tuple: tuple[str] = tuple([tup[i] for i in new_col_indexes])
-        if not (new_tuple in new_table.tuples):
-            new_table.add_tuple(new_tuple)
+    if old_table.store is not None:
+        # Columnar tables can project and dedup the code arrays directly, without decoding any rows
+        new_table.store = old_table.store.project(new_col_indexes)
+    else:
+        new_table.add_tuples(distinct_projection(old_table.tuples, new_col_indexes))
+    if instrumentation.enabled:
+        instrumentation.count("tables_constructed")
+        instrumentation.count("rows_projected", len(old_table.tuples))
+        instrumentation.count("rows_kept", len(new_table.tuples))
     return new_table
 
+def get_index_map(new_col_indexes: list[int]) -> dict[int, int]:
+    '''
+    This takes in the old indexes of the columns of a new table (in the order they are in the new table)\n
+    And returns a dict mapping each old index to its index in the new table
+    '''
+    index_map: dict[int, int] = {}
+    for new_index, old_index in enumerate(new_col_indexes):
+        # If a column shows up twice, the first one wins, same as list.index
+        index_map.setdefault(old_index, new_index)
+    return index_map
+
+def distinct_projection(tuples: 'Iterable[tuple[str]]', col_indexes: list[int]) -> 'Iterator[tuple[str]]':
+    '''
+    This takes in rows and the indexes of the columns to keep, and yields each distinct projected row once\n
+    Rows come out in the order they are first seen, and duplicates are found with a set instead of searching a list
+    '''
+    seen: 'set[tuple[str]]' = set()
+    if len(col_indexes) >= 2:
+        # itemgetter pulls all the columns out in C, it only returns a tuple when given two or more indexes
+        project = itemgetter(*col_indexes)
+    else:
+        project = lambda tup: tuple([tup[i] for i in col_indexes])
+    for tup in tuples:
+        new_tuple = project(tup)
+        if new_tuple in seen:
+            continue
+        seen.add(new_tuple)
+        yield new_tuple
+
+def get_uncovered_dependants(my_table: table.Table, dependancies: list[tuple[list[int], list[int]]]) -> list[int]:
+    '''
+    This takes in a table and the dependencies being split off of it, and returns every attribute
+    the primary key describes (including transitively) that is not a dependant of one of those dependencies\n
+    These are the attributes that stay in the table with the primary key
+    '''
+    pk_bits = to_bitset(my_table.primary_key)
+    covered = pk_bits
+    for det, dep in dependancies:
+        covered |= to_bitset(dep)
+    return from_bitset(my_table.closure_bits(pk_bits) & ~covered)
+
 def is_1nf(my_table: table.Table) -> bool:
     '''
     This takes in a table and returns True if it is in 1nf
     '''
+    if my_table.store is not None:
+        return not my_table.store.has_multivalue()
     for tuple in my_table.tuples:
         for value in tuple:
             if " " in value:
@@ -174,31 +202,33 @@ def first_normal_form(my_table: table.Table) -> list[table.Table]:
     Note: tuples with multivalue attributes will have spaces deliniating the different individual values
     '''
     # We know we will only get back one table from 1nf
-    new_table = table.Table(my_table.columns)
+    new_table = table.Table(my_table.columns, columnar=my_table.is_columnar())
     new_table.primary_key = my_table.primary_key
     new_table.funct_depends = my_table.funct_depends
     new_table.multi_funct_depends = my_table.multi_funct_depends
     
-    new_tuples: 'list[tuple]' = []
-    
-    for tuple in my_table.tuples:
-        new_tuples.append(tuple)
-        for value in tuple:
-            if not (" " in value):
-                continue
-            # Remove the original tuple from new_tuples if it exists, and replace it with singe valued tuples
-            if tuple in new_tuples:
-                new_tuples.remove(tuple)
-            
-            value_index = tuple.index(value)
-            value_list = value.split()
-            for new_val in value_list:
-                new_tuple = tuple[:value_index] + (new_val,) + tuple[value_index+1:]
-                new_tuples.append(new_tuple)
-    new_table.add_tuples(new_tuples)
+    if my_table.store is not None:
+        # Columnar tables only need to touch the rows and columns that actually have multivalued cells
+        new_table.store = my_table.store.expand_multivalues()
+    else:
+        new_table.add_tuples(expand_multivalues(my_table.tuples))
+    if instrumentation.enabled:
+        instrumentation.count("rows_expanded", len(my_table.tuples))
+        instrumentation.count("rows_kept", len(new_table.tuples))
     
     return [new_table]
 
+def expand_multivalues(tuples: 'Iterable[tuple[str]]') -> 'Iterator[tuple[str]]':
+    '''
+    This takes in rows and yields them with every multivalued cell split up, in one pass\n
+    A row with more than one multivalued cell is expanded into every combination of their values
+    '''
+    for tup in tuples:
+        if not any(" " in value for value in tup):
+            yield tup
+            continue
+        yield from product(*[value.split() if " " in value else (value,) for value in tup])
+
 def is_2nf(my_table: table.Table) -> bool:
     '''
     This takes in a table and returns True if it is in 2nf
@@ -220,11 +250,7 @@ def second_normal_form(my_table: table.Table) -> list[table.Table]:
     # So, we add the primary key, and any dependants that arent covered by other tables and add it here
     pk_not_in_dependancies = all(my_table.primary_key != funct_depend[0] for funct_depend in new_dependancies)
     if pk_not_in_dependancies:
-        pk_dependant = my_table.get_dependants(my_table.primary_key)
-        for attr in pk_dependant:
-            for det, dep in new_dependancies:
-                if attr in dep:
-                    pk_dependant.remove(attr)
+        pk_dependant = get_uncovered_dependants(my_table, new_dependancies)
         new_dependancies.append((my_table.primary_key, pk_dependant))
     
     # Now that we have all the dependancies that will be the basis of our new tables,
@@ -256,11 +282,7 @@ def third_normal_form(my_table: table.Table) -> list[table.Table]:
     
     # We need to add the primary key back to the list of new dependancies
     # And remove any determinants represented by any other table
-    pk_dependant = my_table.get_dependants(my_table.primary_key)
-    for attr in pk_dependant:
-        for det, dep in new_dependancies:
-            if attr in dep:
-                pk_dependant.remove(attr)
+    pk_dependant = get_uncovered_dependants(my_table, new_dependancies)
     new_dependancies.append((my_table.primary_key, pk_dependant))
     
     # Now that we have all the dependancies that will be the basis of our new tables,
@@ -274,6 +296,53 @@ def third_normal_form(my_table: table.Table) -> list[table.Table]:
 
     return new_tables
 
+def synthesize_third_normal_form(my_table: table.Table) -> list[table.Table]:
+    '''
+    Takes in a table and returns a list of tables in third normal form, built straight from a minimal cover
+    of its functional dependencies (Bernstein synthesis)\n
+    Unlike third_normal_form, this does not need a 2NF pass first, and never has to enumerate superkeys
+    '''
+    # Group the dependencies of the minimal cover by the closure of their determinant
+    # Determinants with the same closure describe each other, so they go in the same table
+    groups: dict[int, tuple[list[int], int]] = {}
+    for det, dep in my_table.minimal_cover():
+        det_closure = my_table.closure_bits(to_bitset(det))
+        if det_closure in groups:
+            pk, columns = groups[det_closure]
+            groups[det_closure] = (pk, columns | to_bitset(det) | to_bitset(dep))
+        else:
+            groups[det_closure] = (det, to_bitset(det) | to_bitset(dep))
+    
+    # A table whose columns all sit inside another table is redundant, so we drop it
+    # If two tables have the exact same columns we keep the first one
+    group_list = list(groups.values())
+    new_dependancies: 'list[tuple[list[int], list[int]]]' = []
+    for i, (pk, columns) in enumerate(group_list):
+        is_redundant = any(
+            is_subset(columns, other_columns) and (columns != other_columns or j < i)
+            for j, (_, other_columns) in enumerate(group_list) if j != i
+        )
+        if is_redundant:
+            continue
+        new_dependancies.append((pk, from_bitset(columns & ~to_bitset(pk))))
+    
+    # If none of the tables hold a whole candidate key, the join would be lossy, so we add one more table for a key
+    has_key_table = any(
+        my_table.check_if_superkey_bits(to_bitset(det) | to_bitset(dep)) for det, dep in new_dependancies
+    )
+    if not has_key_table:
+        # Any candidate key will do, so we only take the first one
+        key = next(my_table.iter_candidate_keys())
+        new_dependancies.append((key, []))
+    
+    new_tables: list[table.Table] = []
+    for funct_depend in new_dependancies:
+        new_table = construct_table_from_funct_dep(my_table, funct_depend)
+        
+        new_tables.append(new_table)
+    
+    return new_tables
+
 def is_bcnf(my_table: table.Table) -> bool:
     '''
     This takes in a table and returns True if it is in bcnf
@@ -289,8 +358,26 @@ def boyce_codd_normal_form(my_table: table.Table) -> list[table.Table]:
     The tables returned will be in boyce codd normal forms
     '''
     # This is a somewhat recursive algorithm, so that the nonaddiditve join property is fulfilled
-    new_dependancies: 'list[tuple[list[int], list[int]]]' = my_table.get_non_superkey_dependencies()
+    split_tables = boyce_codd_split(my_table)
     # Stop condition
+    if len(split_tables) == 1:
+        return split_tables
+    
+    # We must maintain the nonadditive join property condition, so we will execute the BCNF algorithm recursively
+    new_tables: list[table.Table] = []
+    for split_table in split_tables:
+        new_tables.extend(boyce_codd_normal_form(split_table))
+    
+    # Aaaand return the new tables
+    return new_tables
+
+def boyce_codd_split(my_table: table.Table) -> list[table.Table]:
+    '''
+    Takes in a table and does one step of the BCNF decomposition on it\n
+    Returns [my_table] if it is already in BCNF, otherwise the two tables XA and R - A (which may still need splitting)\n
+    The two tables are independent of each other, so they can be split further in any order (or at the same time)
+    '''
+    new_dependancies: 'list[tuple[list[int], list[int]]]' = my_table.get_non_superkey_dependencies()
     if len(new_dependancies) == 0:
         return [my_table]
     
@@ -304,14 +391,7 @@ def boyce_codd_normal_form(my_table: table.Table) -> list[table.Table]:
     for attr in new_funct_depend[1]:
         new_columns.remove(attr)
     r_minus_a = construct_table_from_cols(my_table, new_columns)
-    
-    # We must maintain the nonadditive join property condition, so we will execute the BCNF algorithm recursively
-    new_tables: list[table.Table] = []
-    new_tables.extend(boyce_codd_normal_form(xa))
-    new_tables.extend(boyce_codd_normal_form(r_minus_a))
-    
-    # Aaaand return the new tables
-    return new_tables
+    return [xa, r_minus_a]
 
 def is_4nf(my_table: table.Table) -> bool:
     '''
@@ -320,8 +400,7 @@ def is_4nf(my_table: table.Table) -> bool:
     if len(my_table.multi_funct_depends) == 0:
         return True
     new_mvd = my_table.multi_funct_depends[0]
-    super_keys = my_table.get_superkeys()
-    if [new_mvd[0]] in super_keys:
+    if my_table.check_if_superkey([new_mvd[0]]):
         return True
     
     return False
@@ -335,18 +414,34 @@ def forth_normal_form(my_table: table.Table) -> list[table.Table]:
     # Even though the textbook may not say it, I will design the decomposition to be similar to BCNF decomposition
     # IE, it will be recursive
     # It worked very well for me in BCNF, so I see no harm in reusing that algorithm
+    split_tables = forth_normal_form_split(my_table)
+    # Stop condition
+    if len(split_tables) == 1:
+        return split_tables
+    
+    # Recursivley call the 4nf function
+    new_tables: list[table.Table] = []
+    for split_table in split_tables:
+        new_tables.extend(forth_normal_form(split_table))
+    
+    # Aaaand return the new tables
+    return new_tables
+
+def forth_normal_form_split(my_table: table.Table) -> list[table.Table]:
+    '''
+    Takes in a table and does one step of the 4NF decomposition on it\n
+    Returns [my_table] if it is already in 4NF, otherwise the two tables XA and R - A (which may still need splitting)
+    '''
     # Stop conditions
     if len(my_table.multi_funct_depends) == 0:
         return [my_table]
     new_mvd = my_table.multi_funct_depends[0]
-    super_keys = my_table.get_superkeys()
-    if [new_mvd[0]] in super_keys:
+    if my_table.check_if_superkey([new_mvd[0]]):
         return [my_table]
     
     # For each non trivial MVD X ->-> A in R where X is not a superkey of R
     # We will create two new relations, one with just the determinant and the dependant of the mvd (XA)
     # And another that contains all attributes originally in R, minus the dependant A (R-A)
-    new_funct_depend = ([new_mvd[0]], [new_mvd[1]])
     xa = construct_table(
         old_table=my_table, 
         new_col_indexes=[new_mvd[0], new_mvd[1]], 
@@ -367,14 +462,7 @@ def forth_normal_form(my_table: table.Table) -> list[table.Table]:
         )
     else:
         r_minus_a = construct_table_from_cols(my_table, new_columns)
-    
-    # Recursivley call the 4nf function
-    new_tables: list[table.Table] = []
-    new_tables.extend(forth_normal_form(xa))
-    new_tables.extend(forth_normal_form(r_minus_a))
-    
-    # Aaaand return the new tables
-    return new_tables
+    return [xa, r_minus_a]
 
 def fifth_normal_form(my_table: table.Table) -> list[table.Table]:
     '''
@@ -0,0 +1,109 @@
+'''
+Prints table rows as a plain text grid, laid out like tabulate's default "simple" format
+(except numbers are right aligned instead of lined up on the decimal point)\n
+The rows are written out one line at a time, and the column widths are worked out from a bounded sample of the rows
+instead of every cell, so printing a big table starts right away and does not need another copy of it in memory.
+A value wider than its column is printed in full, it just pushes the rest of its row over\n
+Modes:
+ - "all" prints every row
+ - "head" prints the first limit rows
+ - "tail" prints the last limit rows
+ - "sample" prints limit rows picked at random (the same ones every time for the same seed), in table order
+'''
+import random
+import sys
+from typing import Iterator, Sequence, TextIO
+
+RENDER_MODES = ("all", "head", "tail", "sample")
+# How many rows are looked at to work out the column widths in "all" mode
+LAYOUT_SAMPLE_SIZE = 1000
+# Spaces between columns, and the space tabulate leaves around a header
+COLUMN_GAP = 2
+HEADER_PADDING = 2
+
+def is_number(value: str) -> bool:
+    '''
+    This returns True if the value reads as a number, numeric columns are right aligned
+    '''
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+def get_column_layout(columns: list[str], sample_rows: 'Sequence[tuple[str]]') -> tuple[list[int], list[bool]]:
+    '''
+    This returns the width of each column and whether it is right aligned, going by the header and sample_rows only
+    '''
+    widths = [len(column) + HEADER_PADDING for column in columns]
+    right_aligned = [len(sample_rows) != 0 for _ in columns]
+    for row in sample_rows:
+        for col, value in enumerate(row):
+            if len(value) > widths[col]:
+                widths[col] = len(value)
+            if right_aligned[col] and not is_number(value):
+                right_aligned[col] = False
+    return (widths, right_aligned)
+
+def format_row(values: 'Sequence[str]', widths: list[int], right_aligned: list[bool]) -> str:
+    '''
+    This pads each value out to the width of its column and joins them into one line
+    '''
+    cells = [
+        value.rjust(width) if right else value.ljust(width)
+        for value, width, right in zip(values, widths, right_aligned)
+    ]
+    return (" " * COLUMN_GAP).join(cells).rstrip()
+
+def select_rows(rows: 'Sequence[tuple[str]]', mode: str, limit: int, seed: int) -> 'Sequence[tuple[str]]':
+    '''
+    This returns the rows a mode prints
+    '''
+    match mode:
+        case "all":
+            return rows
+        case "head":
+            return rows[:limit]
+        case "tail":
+            return rows[max(0, len(rows) - limit):]
+        case "sample":
+            indexes = sorted(random.Random(seed).sample(range(len(rows)), min(limit, len(rows))))
+            return [rows[i] for i in indexes]
+        case _:
+            raise RuntimeError(f"'{mode}' is not a render mode, use one of {RENDER_MODES}")
+
+def iter_table_lines(
+    columns: list[str],
+    rows: 'Sequence[tuple[str]]',
+    mode: str = "all",
+    limit: int = 20,
+    seed: int = 0
+    ) -> Iterator[str]:
+    '''
+    This yields the lines of the rendered table one at a time: the header, a line of dashes, then the rows\n
+    If not every row is printed, a last line says how many were
+    '''
+    selected = select_rows(rows, mode, limit, seed)
+    widths, right_aligned = get_column_layout(columns, selected[:LAYOUT_SAMPLE_SIZE])
+    yield format_row(columns, widths, right_aligned)
+    yield format_row(["-" * width for width in widths], widths, right_aligned)
+    for row in selected:
+        yield format_row(row, widths, right_aligned)
+    if len(selected) != len(rows):
+        yield f"({len(selected)} of {len(rows)} rows shown)"
+
+def render_table(
+    columns: list[str],
+    rows: 'Sequence[tuple[str]]',
+    mode: str = "all",
+    limit: int = 20,
+    seed: int = 0,
+    output: 'TextIO | None' = None
+    ) -> None:
+    '''
+    This writes the rendered table to output (stdout by default) one line at a time
+    '''
+    if output is None:
+        output = sys.stdout
+    for line in iter_table_lines(columns, rows, mode, limit, seed):
+        output.write(line + "\n")
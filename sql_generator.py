@@ -0,0 +1,176 @@
+'''
+Turns normalized tables into SQL: CREATE TABLE statements with primary and foreign keys, then the rows\n
+Rows are streamed out a batch at a time, either as multi-row INSERT statements or in the COPY text format,
+so the SQL for a table with millions of rows is never held in memory all at once\n
+Every column is created as TEXT, since the csv does not say anything about types
+'''
+import re
+from typing import Iterator, TextIO
+
+import table
+
+def quote_identifier(name: str) -> str:
+    '''
+    This wraps a table or column name in double quotes, so names like Lot# are valid SQL
+    '''
+    return '"' + name.replace('"', '""') + '"'
+
+def quote_value(value: str) -> str:
+    '''
+    This turns a value into an SQL string literal
+    '''
+    return "'" + value.replace("'", "''") + "'"
+
+def escape_copy_value(value: str) -> str:
+    '''
+    This escapes a value for the COPY text format, where tabs, newlines and backslashes have special meaning
+    '''
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+def get_table_names(tables: list[table.Table]) -> list[str]:
+    '''
+    This names each table after its primary key columns (like "StudentID_Course"),
+    adding a number to the end of any name that is already taken
+    '''
+    names: list[str] = []
+    for my_table in tables:
+        key_columns = my_table.primary_key if len(my_table.primary_key) != 0 else range(len(my_table.columns))
+        base_name = "_".join(re.sub(r"\W+", "", my_table.columns[i]) or "col" for i in key_columns)
+        name = base_name
+        number = 2
+        while name in names:
+            name = f"{base_name}_{number}"
+            number += 1
+        names.append(name)
+    return names
+
+def get_foreign_keys(tables: list[table.Table]) -> list[list[tuple[list[str], int]]]:
+    '''
+    This returns, for each table, its foreign keys as (column names, index of the referenced table)\n
+    A table references another when it has every column of the other tables primary key,
+    which is how the determinant of a dependency that was split off shows up in the table it came from\n
+    Tables with the same primary key would reference each other, so those are skipped
+    '''
+    key_names = [{my_table.columns[i] for i in my_table.primary_key} for my_table in tables]
+    foreign_keys: list[list[tuple[list[str], int]]] = []
+    for index, my_table in enumerate(tables):
+        columns = set(my_table.columns)
+        table_foreign_keys: list[tuple[list[str], int]] = []
+        for other_index, other_table in enumerate(tables):
+            other_key = key_names[other_index]
+            if other_index == index or len(other_key) == 0 or other_key == key_names[index]:
+                continue
+            if other_key <= columns:
+                table_foreign_keys.append(([other_table.columns[i] for i in other_table.primary_key], other_index))
+        foreign_keys.append(table_foreign_keys)
+    return foreign_keys
+
+def get_creation_order(foreign_keys: list[list[tuple[list[str], int]]]) -> list[int]:
+    '''
+    This returns the table indexes in an order where every table comes after the tables it references,
+    so the foreign keys can be checked as the tables are created and filled
+    '''
+    order: list[int] = []
+    placed: set[int] = set()
+
+    def place(index: int, visiting: set[int]) -> None:
+        if index in placed or index in visiting:
+            # A cycle cant be ordered, so we just leave the rest of it where it is
+            return
+        visiting.add(index)
+        for _, referenced in foreign_keys[index]:
+            place(referenced, visiting)
+        placed.add(index)
+        order.append(index)
+
+    for index in range(len(foreign_keys)):
+        place(index, set())
+    return order
+
+def get_create_statement(
+    my_table: table.Table,
+    name: str,
+    foreign_keys: list[tuple[list[str], int]],
+    names: list[str]
+    ) -> str:
+    '''
+    This returns the CREATE TABLE statement for one table
+    '''
+    lines = [f"    {quote_identifier(column)} TEXT NOT NULL" for column in my_table.columns]
+    if len(my_table.primary_key) != 0:
+        key = ", ".join(quote_identifier(my_table.columns[i]) for i in my_table.primary_key)
+        lines.append(f"    PRIMARY KEY ({key})")
+    for columns, referenced in foreign_keys:
+        key = ", ".join(quote_identifier(column) for column in columns)
+        lines.append(f"    FOREIGN KEY ({key}) REFERENCES {quote_identifier(names[referenced])} ({key})")
+    return f"CREATE TABLE {quote_identifier(name)} (\n" + ",\n".join(lines) + "\n);\n"
+
+def iter_insert_statements(my_table: table.Table, name: str, batch_size: int = 1000) -> Iterator[str]:
+    '''
+    This yields multi-row INSERT statements for the rows of a table, batch_size rows per statement
+    '''
+    header = f"INSERT INTO {quote_identifier(name)} ({', '.join(quote_identifier(column) for column in my_table.columns)}) VALUES\n"
+    batch: list[str] = []
+    for tup in my_table.tuples:
+        batch.append("    (" + ", ".join(quote_value(value) for value in tup) + ")")
+        if len(batch) >= batch_size:
+            yield header + ",\n".join(batch) + ";\n"
+            batch = []
+    if len(batch) != 0:
+        yield header + ",\n".join(batch) + ";\n"
+
+def iter_copy_chunks(my_table: table.Table, batch_size: int = 1000) -> Iterator[str]:
+    '''
+    This yields the rows of a table in the COPY text format (tab separated, one row per line), batch_size rows at a time
+    '''
+    batch: list[str] = []
+    for tup in my_table.tuples:
+        batch.append("\t".join(escape_copy_value(value) for value in tup) + "\n")
+        if len(batch) >= batch_size:
+            yield "".join(batch)
+            batch = []
+    if len(batch) != 0:
+        yield "".join(batch)
+
+def write_sql(tables: list[table.Table], output: TextIO, use_copy: bool = False, batch_size: int = 1000) -> None:
+    '''
+    This writes SQL that creates and fills the tables to output, one statement or batch at a time\n
+    Tables are created in an order where referenced tables come first\n
+    If use_copy is set, rows are written as COPY ... FROM stdin blocks (for psql) instead of INSERT statements
+    '''
+    names = get_table_names(tables)
+    foreign_keys = get_foreign_keys(tables)
+    order = get_creation_order(foreign_keys)
+    for index in order:
+        output.write(get_create_statement(tables[index], names[index], foreign_keys[index], names))
+        output.write("\n")
+    for index in order:
+        my_table = tables[index]
+        if not use_copy:
+            for statement in iter_insert_statements(my_table, names[index], batch_size):
+                output.write(statement)
+            continue
+        columns = ", ".join(quote_identifier(column) for column in my_table.columns)
+        output.write(f"COPY {quote_identifier(names[index])} ({columns}) FROM stdin;\n")
+        for chunk in iter_copy_chunks(my_table, batch_size):
+            output.write(chunk)
+        output.write("\\.\n")
+
+def write_copy_files(tables: list[table.Table], directory: str, batch_size: int = 1000) -> list[str]:
+    '''
+    This writes the rows of each table to its own COPY format file in directory, named after the table,
+    and returns the paths of the files in the same order as the tables
+    '''
+    paths: list[str] = []
+    for my_table, name in zip(tables, get_table_names(tables)):
+        path = f"{directory}/{name}.tsv"
+        with open(path, "w") as copy_file:
+            for chunk in iter_copy_chunks(my_table, batch_size):
+                copy_file.write(chunk)
+        paths.append(path)
+    return paths
@@ -0,0 +1,142 @@
+'''
+Loads normalized tables straight into a SQLite database, without going through an SQL text file\n
+Each table is filled with executemany inside one transaction, with the journal kept in memory and syncing turned off,
+and the primary key and foreign key indexes are only built once the rows are in, which is much quicker than
+keeping them up to date row by row
+'''
+from itertools import islice
+import sqlite3
+from typing import Iterable
+
+import main
+import normalizer
+import table
+import verifier
+from sql_generator import quote_identifier, get_table_names, get_foreign_keys, get_creation_order
+
+# Settings for the connection while loading, the database is only written to disk properly once everything is in
+# The journal is kept in memory rather than turned off, since ROLLBACK is undefined in SQLite without one
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    "PRAGMA locking_mode = EXCLUSIVE",
+]
+
+def get_create_statement(
+    my_table: table.Table,
+    name: str,
+    foreign_keys: list[tuple[list[str], int]],
+    names: list[str]
+    ) -> str:
+    '''
+    This returns the CREATE TABLE statement for a table, leaving out the primary key so no index is kept up to date
+    while loading (create_indexes adds it as a unique index afterwards)
+    '''
+    lines = [f"{quote_identifier(column)} TEXT NOT NULL" for column in my_table.columns]
+    for columns, referenced in foreign_keys:
+        key = ", ".join(quote_identifier(column) for column in columns)
+        lines.append(f"FOREIGN KEY ({key}) REFERENCES {quote_identifier(names[referenced])} ({key})")
+    return f"CREATE TABLE {quote_identifier(name)} ({', '.join(lines)})"
+
+def load_rows(
+    connection: sqlite3.Connection,
+    name: str,
+    width: int,
+    rows: 'Iterable[tuple[str]]',
+    batch_size: int = 10000
+    ) -> int:
+    '''
+    This inserts rows into a table in one transaction, handing them to executemany batch_size at a time\n
+    rows can be any iterable, they are only read through once. Returns how many rows were inserted
+    '''
+    statement = f"INSERT INTO {quote_identifier(name)} VALUES ({', '.join('?' * width)})"
+    rows = iter(rows)
+    row_count = 0
+    connection.execute("BEGIN")
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if len(batch) == 0:
+                break
+            connection.executemany(statement, batch)
+            row_count += len(batch)
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+    return row_count
+
+def create_indexes(
+    connection: sqlite3.Connection,
+    tables: list[table.Table],
+    names: list[str],
+    foreign_keys: list[list[tuple[list[str], int]]]
+    ) -> None:
+    '''
+    This builds a unique index on the primary key of each table, and an index on the columns of each foreign key
+    '''
+    connection.execute("BEGIN")
+    for index, my_table in enumerate(tables):
+        name = names[index]
+        if len(my_table.primary_key) != 0:
+            key = ", ".join(quote_identifier(my_table.columns[i]) for i in my_table.primary_key)
+            connection.execute(f"CREATE UNIQUE INDEX {quote_identifier(name + '_pk')} ON {quote_identifier(name)} ({key})")
+        for fk_number, (columns, _) in enumerate(foreign_keys[index]):
+            key = ", ".join(quote_identifier(column) for column in columns)
+            index_name = quote_identifier(f"{name}_fk{fk_number}")
+            connection.execute(f"CREATE INDEX {index_name} ON {quote_identifier(name)} ({key})")
+    connection.execute("COMMIT")
+
+def export_tables(
+    tables: list[table.Table],
+    database_location: str,
+    batch_size: int = 10000,
+    rows: 'list[Iterable[tuple[str]]] | None' = None
+    ) -> list[str]:
+    '''
+    This creates a SQLite table for each table (named like sql_generator names them), loads their rows,
+    then builds the indexes, and returns the table names in the same order as the tables\n
+    rows can be given to load each table from something other than its tuples, one iterable per table\n
+    Raises a sqlite3.IntegrityError if the rows of a table are not unique on its primary key
+    '''
+    names = get_table_names(tables)
+    foreign_keys = get_foreign_keys(tables)
+    # isolation_level None means we decide where the transactions go
+    connection = sqlite3.connect(database_location, isolation_level=None)
+    try:
+        for pragma in LOAD_PRAGMAS:
+            connection.execute(pragma)
+        for index in get_creation_order(foreign_keys):
+            my_table = tables[index]
+            connection.execute(get_create_statement(my_table, names[index], foreign_keys[index], names))
+            table_rows = rows[index] if rows is not None else my_table.tuples
+            load_rows(connection, names[index], len(my_table.columns), table_rows, batch_size)
+        create_indexes(connection, tables, names, foreign_keys)
+    finally:
+        connection.close()
+    return names
+
+def export_normalized_streaming(
+    start_table: table.Table,
+    form: int,
+    database_location: str,
+    batch_size: int = 10000,
+    synthesize_3nf: bool = False
+    ) -> list[table.Table]:
+    '''
+    This normalizes start_table and loads the result into a SQLite database, without building the tuples of any
+    normalized table\n
+    Normalization only looks at the columns and dependencies, so it is run on a copy of the schema with no tuples.
+    Every normalized table is then a projection of start_table (with its multivalued cells split up),
+    so its rows are streamed straight from start_table through expand_multivalues and distinct_projection\n
+    Returns the normalized tables, which have no tuples, start_table is not changed
+    '''
+    table_list = main.normalize_to_form(start_table.copy_schema(), form, synthesize_3nf=synthesize_3nf, verbose=False)
+    rows = [
+        normalizer.distinct_projection(normalizer.expand_multivalues(start_table.tuples), col_indexes)
+        for col_indexes in verifier.get_table_attributes(start_table, table_list)
+    ]
+    export_tables(table_list, database_location, batch_size, rows)
+    return table_list
@@ -1,22 +1,246 @@
-from tabulate import tabulate
+from typing import Any, Callable, Hashable, Iterable, Iterator, Sequence
+
+from bitset import AttributeSet, to_bitset, from_bitset, full_bitset, has_attribute, is_subset, bitset_size
+from columnar import ColumnStore, TupleView
+import fd_discovery
+import instrumentation
+import renderer
+import validator
+
+# How many orders find_key_with_attribute tries before giving up
+PRIME_SEARCH_ATTEMPTS = 8
+
+class SchemaList(list):
+    '''
+    A list that counts how many times it (or any list nested inside it) has been modified\n
+    Table keeps its primary key and dependencies in these, so it can tell when its cached keys and closures are out of date
+    '''
+    
+    def __init__(self, items=(), version: 'list[int] | None' = None):
+        # The version is a one item list so that nested lists can share and bump the same counter
+        self.version: list[int] = version if version is not None else [0]
+        super().__init__(self.wrap(item) for item in items)
+    
+    def wrap(self, item):
+        '''
+        This converts any lists inside of an item (like the determinant and dependant of a dependency) into SchemaLists
+        that share our version counter, so editing them in place is noticed too
+        '''
+        if isinstance(item, tuple):
+            return tuple(self.wrap(part) for part in item)
+        if isinstance(item, SchemaList) and item.version is self.version:
+            return item
+        if isinstance(item, list):
+            return SchemaList(item, self.version)
+        return item
+    
+    def modified(self) -> None:
+        self.version[0] += 1
+    
+    def __reduce__(self):
+        # Rebuild through __init__ when unpickling, so the shared version counter comes back before any items are added
+        return (SchemaList, (list(self), self.version))
+    
+    def append(self, item) -> None:
+        super().append(self.wrap(item))
+        self.modified()
+    
+    def extend(self, items) -> None:
+        super().extend(self.wrap(item) for item in items)
+        self.modified()
+    
+    def insert(self, index, item) -> None:
+        super().insert(index, self.wrap(item))
+        self.modified()
+    
+    def remove(self, item) -> None:
+        super().remove(item)
+        self.modified()
+    
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self.modified()
+        return item
+    
+    def clear(self) -> None:
+        super().clear()
+        self.modified()
+    
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self.modified()
+    
+    def reverse(self) -> None:
+        super().reverse()
+        self.modified()
+    
+    def __setitem__(self, index, item) -> None:
+        if isinstance(index, slice):
+            super().__setitem__(index, [self.wrap(part) for part in item])
+        else:
+            super().__setitem__(index, self.wrap(item))
+        self.modified()
+    
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self.modified()
+    
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+    
+    def __imul__(self, count):
+        super().__imul__(count)
+        self.modified()
+        return self
 
 class Table:
     
     def __init__(
         self, 
         columns: list[str], 
-        tuples: 'list[tuple[str]]' = []
+        tuples: 'Iterable[tuple[str]]' = (),
+        columnar: bool = False
     ):
+        '''
+        The tuples can be any iterable (like a generator reading from a csv), they are only read through once\n
+        If columnar is set, the rows are stored dictionary encoded by column (see columnar.py) instead of as a list of tuples
+        '''
         self.columns: list[str] = columns
         
-        self.tuples: 'list[tuple[str]]' = []
-        for tuple in tuples:
-            self.add_tuple(tuple)
+        # Closures, keys and primes are cached here, and thrown out whenever the schema changes
+        self.cache: dict = {}
+        self.cache_version: 'tuple | None' = None
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        
+        # Only one of these is used, depending on if the table is columnar
+        self.tuple_list: 'list[tuple[str]]' = []
+        self.store: 'ColumnStore | None' = ColumnStore(len(columns)) if columnar else None
+        # Maps PK values to positions in the tuples, only built once a lookup needs it (see get_pk_index)
+        self.pk_index: 'dict[tuple, int] | None' = None
+        self.pk_index_version: int = 0
+        self.add_tuples(tuples)
         
         # These will be set in other functions
         self.primary_key: list[int] = []
         self.funct_depends: 'list[tuple[list[int], list[int]]]'= []
         self.multi_funct_depends: 'list[tuple[int, int]]' = []
+    
+    @property
+    def tuples(self) -> 'list[tuple[str]] | TupleView':
+        '''
+        The rows of the table\n
+        For a columnar table this is a read only view that decodes rows as they are read, use add_tuple to add rows
+        '''
+        if self.store is not None:
+            return TupleView(self.store)
+        return self.tuple_list
+    
+    @tuples.setter
+    def tuples(self, tuples: 'Iterable[tuple[str]]') -> None:
+        self.pk_index = None
+        if self.store is not None:
+            self.store = ColumnStore(len(self.columns))
+            self.add_tuples(tuples)
+        else:
+            # The tuples may be a generator, so we read them into a list we can index and go through more than once
+            self.tuple_list = list(tuples)
+    
+    def is_columnar(self) -> bool:
+        return self.store is not None
+
+    def copy_schema(self) -> 'Table':
+        '''
+        This returns a new table with the same columns, primary key and dependencies as this one, but no tuples\n
+        Nothing in the new table is shared with this one, so either can be edited without changing the other
+        '''
+        new_table = Table(list(self.columns), columnar=self.is_columnar())
+        new_table.primary_key = list(self.primary_key)
+        new_table.funct_depends = [(list(det), list(dep)) for det, dep in self.funct_depends]
+        new_table.multi_funct_depends = list(self.multi_funct_depends)
+        return new_table
+
+    def copy_sharing_rows(self) -> 'Table':
+        '''
+        This returns a copy of the table like copy_schema, but with the same tuples as this one\n
+        The rows are shared instead of copied, so this is cheap, but it is only meant for copies that just read them
+        (rows added to either table would show up in both)
+        '''
+        new_table = self.copy_schema()
+        new_table.tuple_list = self.tuple_list
+        new_table.store = self.store
+        return new_table
+
+    # The primary key and dependencies are properties so that replacing them also clears the cache
+    @property
+    def primary_key(self) -> list[int]:
+        return self._primary_key
+    
+    @primary_key.setter
+    def primary_key(self, primary_key: list[int]) -> None:
+        self._primary_key = primary_key if isinstance(primary_key, SchemaList) else SchemaList(primary_key)
+        self.pk_index = None
+        self.clear_cache()
+    
+    @property
+    def funct_depends(self) -> 'list[tuple[list[int], list[int]]]':
+        return self._funct_depends
+    
+    @funct_depends.setter
+    def funct_depends(self, funct_depends: 'list[tuple[list[int], list[int]]]') -> None:
+        self._funct_depends = funct_depends if isinstance(funct_depends, SchemaList) else SchemaList(funct_depends)
+        self.clear_cache()
+    
+    @property
+    def multi_funct_depends(self) -> 'list[tuple[int, int]]':
+        return self._multi_funct_depends
+    
+    @multi_funct_depends.setter
+    def multi_funct_depends(self, multi_funct_depends: 'list[tuple[int, int]]') -> None:
+        self._multi_funct_depends = multi_funct_depends if isinstance(multi_funct_depends, SchemaList) else SchemaList(multi_funct_depends)
+        self.clear_cache()
+    
+    def get_schema_version(self) -> tuple:
+        '''
+        This returns a value that changes whenever the columns, primary key or dependencies are edited
+        '''
+        return (
+            len(self.columns),
+            self._primary_key.version[0],
+            self._funct_depends.version[0],
+            self._multi_funct_depends.version[0]
+        )
+    
+    def clear_cache(self) -> None:
+        '''
+        This throws out every cached closure, key and prime for the table
+        '''
+        self.cache = {}
+        self.cache_version = None
+    
+    def get_cached(self, key: tuple, compute: 'Callable[[], Any]') -> Any:
+        '''
+        This returns the cached value for the key, or calls compute and caches what it returns\n
+        The cache is cleared first if the schema changed since the cached values were computed
+        '''
+        version = self.get_schema_version()
+        if self.cache_version != version:
+            self.cache = {}
+            self.cache_version = version
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+        self.cache_misses += 1
+        value = compute()
+        self.cache[key] = value
+        return value
+    
+    def get_cache_info(self) -> dict[str, int]:
+        '''
+        This returns the cache hit and miss counters, and how many values are currently cached
+        '''
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "size": len(self.cache)}
         
     def set_primary_key(self, attributes: list[str])-> None:
         '''
@@ -33,64 +257,204 @@ class Table:
         '''
         This takes in a list of integers representing attributes and outputs True if they fully describe the whole table
         '''
-        # We remove attributes from this list if they are described by some dependant
-        remaining_attributes = list(range(len(self.columns)))
+        return self.check_if_superkey_bits(to_bitset(key))
+    
+    def check_if_superkey_bits(self, key: AttributeSet) -> bool:
+        '''
+        This takes in a bitmask of attributes and outputs True if they fully describe the whole table
+        '''
+        return is_subset(full_bitset(len(self.columns)), self.closure_bits(key))
+    
+    def get_closure_index(self) -> 'tuple[list[tuple[AttributeSet, AttributeSet]], list[list[int]]]':
+        '''
+        This returns the cached index used by the closure engine, see compute_closure_index
+        '''
+        return self.get_cached(("closure_index",), self.compute_closure_index)
+    
+    def compute_closure_index(self) -> 'tuple[list[tuple[AttributeSet, AttributeSet]], list[list[int]]]':
+        '''
+        This builds the index used by the closure engine\n
+        Returns the functional dependencies as (determinant, dependant) bitmasks,
+        and a list that maps each attribute to the indexes of the dependencies with it in their determinant
+        '''
+        fd_bits: 'list[tuple[AttributeSet, AttributeSet]]' = []
+        attr_to_fds: list[list[int]] = [[] for _ in self.columns]
+        for det, dep in self.funct_depends:
+            det_bits = to_bitset(det)
+            for attr in from_bitset(det_bits):
+                attr_to_fds[attr].append(len(fd_bits))
+            fd_bits.append((det_bits, to_bitset(dep)))
+        return fd_bits, attr_to_fds
+    
+    def closure_bits(self, attributes: AttributeSet) -> AttributeSet:
+        '''
+        This takes in a bitmask of attributes and returns a bitmask of every attribute they functionally determine, using the cache
+        '''
+        if instrumentation.enabled:
+            instrumentation.count("closure_calls")
+        return self.get_cached(("closure", attributes), lambda: self.compute_closure_bits(attributes))
+    
+    def compute_closure_bits(self, attributes: AttributeSet) -> AttributeSet:
+        '''
+        This takes in a bitmask of attributes and returns a bitmask of every attribute they functionally determine\n
+        Each dependency keeps a count of determinant attributes not yet in the closure, and fires when it hits zero,
+        so one closure costs time linear in the total size of the functional dependencies
+        '''
+        if instrumentation.enabled:
+            instrumentation.count("closures_computed")
+        fd_bits, attr_to_fds = self.get_closure_index()
+        closure = attributes
+        # Attributes in the closure whose dependencies we have not looked at yet
+        pending = from_bitset(attributes)
         
-        # All attributes describe themselves, so we remove any that appear explicitly in the key
-        for attr in key:
-            remaining_attributes.remove(attr)
-        if len(remaining_attributes) == 0:
-            return True
+        missing_counts: list[int] = []
+        for det, dep in fd_bits:
+            missing_counts.append(bitset_size(det))
+            # A dependency with an empty determinant holds no matter what we start with
+            if det == 0 and not is_subset(dep, closure):
+                pending.extend(from_bitset(dep & ~closure))
+                closure |= dep
         
-        # We create a copy of the key so that we can add dependants to it
-        effective_key = key.copy()
-        # We now loop until we empty remaining attributes because they are described by the effective key (return statement)
-        # Or we run out of new functional dependancies to match with (invariant is failed to be set)
-        invariant = True
-        while invariant:
-            invariant = False
-            
-            # Now we go through each dependancy and see if we have a match that hasnt yet occured
-            for det, dep in self.funct_depends:
-                det_in_effective_key = all(attr in effective_key for attr in det)
-                if not det_in_effective_key:
+        while pending:
+            attr = pending.pop()
+            for fd_index in attr_to_fds[attr]:
+                missing_counts[fd_index] -= 1
+                if missing_counts[fd_index] != 0:
                     continue
-                dep_in_effective_key = all(attr in effective_key for attr in dep)
-                if dep_in_effective_key:
-                    # Means we already have explored this dependency
+                # Every attribute of the determinant is in the closure, so the dependants are too
+                new_attributes = fd_bits[fd_index][1] & ~closure
+                if new_attributes == 0:
                     continue
-                for attr in dep:
-                    # Remove from remaining attributes
-                    if attr in remaining_attributes:
-                        remaining_attributes.remove(attr)
-                    # Return true if remaining is empty
-                    if len(remaining_attributes) == 0:
-                        return True # <---------------- If we empty remaining attrubutes
-                    # Add to effective key
-                    if not (attr in effective_key):
-                        effective_key.append(attr)
-                invariant = True
-                break
-        # In this case, the invariant is not set 
-        # Meaning we have run out of functional dependencies before we could empty remaining attributes
-        return False
+                pending.extend(from_bitset(new_attributes))
+                closure |= new_attributes
+        return closure
+    
+    def closure(self, attributes: list[int]) -> list[int]:
+        '''
+        This takes in a list of integers representing attributes and returns a list of every attribute they functionally determine
+        '''
+        return from_bitset(self.closure_bits(to_bitset(attributes)))
+    
+    def minimal_cover(self) -> 'list[tuple[list[int], list[int]]]':
+        '''
+        This returns a minimal cover of the functional dependencies of the table, in the same format as self.funct_depends\n
+        The dependants are split up, extraneous determinant attributes and redundant dependencies are dropped,
+        and then dependencies with the same determinant are merged back together\n
+        This does not change self.funct_depends, assign the result to it if you want to use it
+        '''
+        # Step 1: Split every dependency into ones with a single dependant, skipping trivial ones
+        # The lists keep the order dependencies first showed up in, and the sets are for quick duplicate checks
+        single_depends: 'list[tuple[AttributeSet, int]]' = []
+        seen_single: 'set[tuple[AttributeSet, int]]' = set()
+        for det, dep in self.funct_depends:
+            det_bits = to_bitset(det)
+            for attr in from_bitset(to_bitset(dep) & ~det_bits):
+                if (det_bits, attr) not in seen_single:
+                    seen_single.add((det_bits, attr))
+                    single_depends.append((det_bits, attr))
+        
+        # Step 2: Remove extraneous attributes from each determinant
+        # Shrinking X -> A to (X - B) -> A does not change the closure, so we can keep using our own (cached) closures
+        reduced_depends: 'list[tuple[AttributeSet, int]]' = []
+        seen_reduced: 'set[tuple[AttributeSet, int]]' = set()
+        for det_bits, attr in single_depends:
+            for det_attr in from_bitset(det_bits):
+                smaller_det = det_bits & ~(1 << det_attr)
+                if has_attribute(self.closure_bits(smaller_det), attr):
+                    det_bits = smaller_det
+            if (det_bits, attr) not in seen_reduced:
+                seen_reduced.add((det_bits, attr))
+                reduced_depends.append((det_bits, attr))
+        
+        # Step 3: Drop any dependency that the remaining dependencies already imply
+        # We check this with a scratch table, since the dependencies we are closing over change as we go
+        scratch_table = Table(self.columns)
+        scratch_table.funct_depends = [(from_bitset(det_bits), [attr]) for det_bits, attr in reduced_depends]
+        index = 0
+        while index < len(scratch_table.funct_depends):
+            det, dep = scratch_table.funct_depends.pop(index)
+            if has_attribute(scratch_table.closure_bits(to_bitset(det)), dep[0]):
+                continue
+            scratch_table.funct_depends.insert(index, (det, dep))
+            index += 1
+        
+        # Step 4: Merge the dependencies with the same determinant, keeping the order they first showed up in
+        merged_depends: 'dict[AttributeSet, list[int]]' = {}
+        for det, dep in scratch_table.funct_depends:
+            merged_depends.setdefault(to_bitset(det), []).extend(dep)
+        return [(from_bitset(det_bits), sorted(dep)) for det_bits, dep in merged_depends.items()]
     
-    def super_key_recursion(self, current_attributes: list[int], super_keys: list[list[int]] = []) -> list[list[int]]:
+    def project_funct_depends(self, attributes: list[int]) -> 'list[tuple[list[int], list[int]]]':
+        '''
+        This returns a minimal cover of the functional dependencies that hold on just the given attributes,
+        including ones that are only implied through attributes outside of them\n
+        The indexes are the same as in this table, in the same format as self.funct_depends\n
+        We compute the closure of every free subset of the attributes, smallest first. A set is free if none of its
+        attributes are determined by the rest of it, any other set has the same closure as a smaller one,
+        so it cant give a dependency the smaller one does not. That also skips every superset of a key.
+        Attributes in no determinant are left out as well, adding one to a set only adds itself to the closure
+        '''
+        projected_bits = to_bitset(attributes)
+        fd_bits, _ = self.get_closure_index()
+        determinant_bits = 0
+        for det, _ in fd_bits:
+            determinant_bits |= det
+        search_attributes = from_bitset(projected_bits & determinant_bits)
+        
+        projected_depends: 'list[tuple[list[int], list[int]]]' = []
+        # Maps each free set on the current level to its closure within the attributes
+        # These closures are only needed here, so we keep them in the levels instead of the table cache
+        level: 'dict[AttributeSet, AttributeSet]' = {0: self.compute_closure_bits(0) & projected_bits}
+        previous_level: 'dict[AttributeSet, AttributeSet]' = {}
+        while len(level) != 0:
+            next_level: 'dict[AttributeSet, AttributeSet]' = {}
+            for free_set, closure in level.items():
+                if instrumentation.enabled:
+                    instrumentation.count("projection_sets")
+                # We only keep the attributes no smaller set already determines, so every determinant found is minimal
+                dependants = closure & ~free_set
+                for other in from_bitset(free_set):
+                    dependants &= ~previous_level[free_set & ~(1 << other)]
+                if dependants != 0:
+                    projected_depends.append((from_bitset(free_set), from_bitset(dependants)))
+                for attr in search_attributes:
+                    # Sets only grow by attributes above their highest one, so each set is made once
+                    if 1 << attr <= free_set or has_attribute(closure, attr):
+                        continue
+                    new_set = free_set | (1 << attr)
+                    # Every subset one smaller has to be free and not determine the attribute that was left out of it
+                    is_free = all(
+                        (new_set & ~(1 << other)) in level and not has_attribute(level[new_set & ~(1 << other)], other)
+                        for other in from_bitset(free_set)
+                    )
+                    if is_free:
+                        next_level[new_set] = self.compute_closure_bits(new_set) & projected_bits
+            previous_level = level
+            level = next_level
+        
+        # Some of the dependencies found can still be implied by the others, so we let minimal_cover drop them
+        scratch_table = Table(self.columns)
+        scratch_table.funct_depends = projected_depends
+        return scratch_table.minimal_cover()
+    
+    def super_key_recursion(self, current_attributes: AttributeSet, super_keys: 'list[AttributeSet]', explored: 'set[AttributeSet]') -> 'list[AttributeSet]':
         '''
         Recursive helper function for finding superkeys\n
         Dont call this outside of the class, itll be weird
         '''
         # In this function, we are working from the top down,
-        # Meaning we are starting with an attributes list containing all attributes
+        # Meaning we are starting with an attributes bitmask containing all attributes
         # And eliminating one at each recursion step, once for each remaining attribute
         
+        if instrumentation.enabled:
+            instrumentation.count("superkey_nodes")
         # Stop condition(s)
         # 1) If we are exploring a duplicate possibility
-        if current_attributes in super_keys:
+        if current_attributes in explored:
             return super_keys
+        explored.add(current_attributes)
         # 2) If this recursion is no longer a superkey
-        is_superkey = self.check_if_superkey(current_attributes)
-        #print(f"{[self.columns[i] for i in current_attributes]} is superkey? {is_superkey}") # Debug
+        is_superkey = self.check_if_superkey_bits(current_attributes)
         if not is_superkey:
             return super_keys
         
@@ -98,54 +462,196 @@ class Table:
         super_keys.append(current_attributes)
         
         # Remove one attribute and recur for each attribute removed
-        for attr in current_attributes:
-            new_attributes = current_attributes.copy()
-            new_attributes.remove(attr)
-            #print(f"Testing key: {[self.columns[i] for i in new_attributes]}")
-            
-            self.super_key_recursion(new_attributes, super_keys)
+        for attr in from_bitset(current_attributes):
+            new_attributes = current_attributes & ~(1 << attr)
+            self.super_key_recursion(new_attributes, super_keys, explored)
         return super_keys
     
+    def get_superkey_bits(self) -> 'list[AttributeSet]':
+        '''
+        This returns a list of bitmasks representing superkeys of the table, using the cache
+        '''
+        return list(self.get_cached(("superkeys",), self.compute_superkey_bits))
+    
+    def compute_superkey_bits(self) -> 'list[AttributeSet]':
+        '''
+        This returns a list of bitmasks representing superkeys of the table
+        '''
+        current_columns = full_bitset(len(self.columns))
+        return self.super_key_recursion(current_columns, [], set())
+    
     def get_superkeys(self) -> list[list[int]]:
         '''
         This returns a list of integers representing superkeys of the table
         '''
-        current_columns = list(range(len(self.columns)))
-        supa_keys = self.super_key_recursion(current_columns, [])
-        return supa_keys
-            
-    def get_candidate_keys(self) -> list[list[int]]:
+        return [from_bitset(key) for key in self.get_superkey_bits()]
+    
+    def minimize_superkey_bits(self, key: AttributeSet) -> AttributeSet:
         '''
-        This returns a list of lists of integers representing candidate keys of the table
+        This takes in a bitmask of a superkey and drops attributes from it until it is a candidate key
         '''
-        super_keys = self.get_superkeys()
-        super_keys.sort(key=len)
-        
-        candidate_keys: list[list[int]] = []
+        # We try to drop the lowest attributes first, same as the order the superkey recursion drops them in
+        for attr in from_bitset(key):
+            smaller_key = key & ~(1 << attr)
+            if self.check_if_superkey_bits(smaller_key):
+                key = smaller_key
+        return key
+    
+    def iter_candidate_key_bits(self) -> 'Iterator[AttributeSet]':
+        '''
+        This yields bitmasks of the candidate keys of the table one at a time, in the order they are found\n
+        Uses the Lucchesi-Osborn algorithm, so the time between keys is polynomial and no superkeys are enumerated
+        '''
+        fd_bits, _ = self.get_closure_index()
         
-        for pot_can in super_keys:
-            is_candidate = True
-            for attr in pot_can:
-                temp = pot_can.copy()
-                temp.remove(attr)
-                if temp in super_keys:
-                    is_candidate = False
-                    break
-            if is_candidate:
-                candidate_keys.append(pot_can)
+        # Any candidate key works as a starting point, so we shrink the set of every attribute down to one
+        candidate_keys = [self.minimize_superkey_bits(full_bitset(len(self.columns)))]
+        yield candidate_keys[0]
         
+        # For each key K and dependency X -> Y, X + (K - Y) is a superkey
+        # Every candidate key can be reached this way, and we only shrink the ones not already covered by a known key
+        key_index = 0
+        while key_index < len(candidate_keys):
+            key = candidate_keys[key_index]
+            key_index += 1
+            if instrumentation.enabled:
+                instrumentation.count("candidate_key_nodes", len(fd_bits))
+            for det, dep in fd_bits:
+                new_superkey = det | (key & ~dep)
+                if any(is_subset(known_key, new_superkey) for known_key in candidate_keys):
+                    continue
+                new_key = self.minimize_superkey_bits(new_superkey)
+                candidate_keys.append(new_key)
+                yield new_key
+    
+    def iter_candidate_keys(self) -> 'Iterator[list[int]]':
+        '''
+        This yields lists of integers representing candidate keys of the table one at a time, in the order they are found\n
+        Use this instead of get_candidate_keys if you only need the first few keys
+        '''
+        for key in self.iter_candidate_key_bits():
+            yield from_bitset(key)
+    
+    def get_candidate_key_bits(self) -> 'list[AttributeSet]':
+        '''
+        This returns a list of bitmasks representing candidate keys of the table, shortest first, using the cache
+        '''
+        return list(self.get_cached(("candidate_keys",), self.compute_candidate_key_bits))
+    
+    def compute_candidate_key_bits(self) -> 'list[AttributeSet]':
+        '''
+        This returns a list of bitmasks representing candidate keys of the table, shortest first
+        '''
+        candidate_keys = list(self.iter_candidate_key_bits())
+        # Keys of the same length are ordered the way the old top down superkey search found them,
+        # which is by the attributes missing from the key
+        all_attributes = full_bitset(len(self.columns))
+        candidate_keys.sort(key=lambda key: (bitset_size(key), from_bitset(all_attributes & ~key)))
         return candidate_keys
             
+    def get_candidate_keys(self) -> list[list[int]]:
+        '''
+        This returns a list of lists of integers representing candidate keys of the table
+        '''
+        return [from_bitset(key) for key in self.get_candidate_key_bits()]
+    
+    def get_prime_bits(self) -> AttributeSet:
+        '''
+        This returns a bitmask of the attributes that are prime, using the cache
+        '''
+        return self.get_cached(("primes",), self.compute_prime_bits)
+    
+    def classify_attribute_bits(self) -> 'tuple[AttributeSet, AttributeSet, AttributeSet]':
+        '''
+        This sorts the attributes by which sides of the (non trivial) functional dependencies they are on,
+        and returns bitmasks of the attributes that are (always prime, never prime, undecided)\n
+        An attribute on no right side cant be determined by anything else, so it is in every key.
+        Every key holds those, so anything they determine is in no key. Neither is an attribute on a right side where
+        every dependency with it in the determinant only adds never prime attributes (which holds straight away for
+        attributes only on right sides). Dropping all of those from a key leaves a set that still determines
+        everything else first, and then them in turn\n
+        The rest are left undecided
+        '''
+        fd_bits, _ = self.get_closure_index()
+        left_side = 0
+        right_side = 0
+        non_trivial: 'list[tuple[AttributeSet, AttributeSet]]' = []
+        for det, dep in fd_bits:
+            # The trivial part of a dependency says nothing about keys, so we leave it out
+            dep &= ~det
+            if dep == 0:
+                continue
+            left_side |= det
+            right_side |= dep
+            non_trivial.append((det, dep))
+        always_prime = full_bitset(len(self.columns)) & ~right_side
+        never_prime = (right_side & ~left_side) | (self.compute_closure_bits(always_prime) & ~always_prime)
+        changed = True
+        while changed:
+            changed = False
+            for attr in from_bitset(right_side & ~never_prime):
+                if all(is_subset(dep, never_prime) for det, dep in non_trivial if has_attribute(det, attr)):
+                    never_prime |= 1 << attr
+                    changed = True
+        return (always_prime, never_prime, right_side & ~never_prime)
+    
+    def find_key_with_attribute(self, attr: int, attempts: int = PRIME_SEARCH_ATTEMPTS) -> 'AttributeSet | None':
+        '''
+        This looks for a candidate key containing attr, returning it as a bitmask, or None if none was found\n
+        A key with attr exists exactly when some set Y not determining attr has Y + attr as a superkey, and it is
+        enough to check the largest such Y. Each attempt grows one of those greedily, adding the other attributes
+        in a different order, so this takes at most attempts * (number of columns) closures.
+        None does not prove attr is not prime, just that these attempts did not find a key with it
+        '''
+        column_count = len(self.columns)
+        for attempt in range(min(attempts, column_count)):
+            avoiding = 0
+            for offset in range(column_count):
+                other = (attr + 1 + attempt + offset) % column_count
+                if other == attr or has_attribute(avoiding, other):
+                    continue
+                # The closures are only needed here, so they are kept out of the cache
+                closure = self.compute_closure_bits(avoiding | (1 << other))
+                if not has_attribute(closure, attr):
+                    avoiding = closure
+            if self.check_if_superkey_bits(avoiding | (1 << attr)):
+                # Nothing in avoiding determines attr, so minimizing never drops it
+                return self.minimize_superkey_bits(avoiding | (1 << attr))
+        return None
+    
+    def compute_prime_bits(self) -> AttributeSet:
+        '''
+        This returns a bitmask of the attributes that are prime\n
+        Most attributes are settled by classify_attribute_bits without looking for keys. Each undecided attribute then
+        gets a bounded search for a key containing it (see find_key_with_attribute), and every key found settles all
+        of its attributes at once\n
+        Only if some attribute is still undecided after that do we fall back to enumerating candidate keys, stopping
+        once it has shown up in one. That fallback is not bounded, it goes through every key when the attribute
+        really is not prime
+        '''
+        prime_attributes, _, undecided = self.classify_attribute_bits()
+        for attr in from_bitset(undecided):
+            if has_attribute(prime_attributes, attr):
+                continue
+            key = self.find_key_with_attribute(attr)
+            if key is not None:
+                prime_attributes |= key
+        undecided &= ~prime_attributes
+        if undecided == 0:
+            return prime_attributes
+        if instrumentation.enabled:
+            instrumentation.count("prime_search_fallbacks")
+        for key in self.iter_candidate_key_bits():
+            prime_attributes |= key
+            if is_subset(undecided, prime_attributes):
+                break
+        return prime_attributes
+            
     def get_primes(self) -> list[int]:
         '''
         This returns a list of integers representing the index of attributes that are prime
         '''
-        candidate_keys = self.get_candidate_keys()
-        
-        prime_attributes = []
-        for key in candidate_keys:
-            prime_attributes.extend(attr for attr in key if attr not in prime_attributes)
-        return prime_attributes
+        return from_bitset(self.get_prime_bits())
     
     def set_functional_dependencies(self, *dependencies: tuple[list[str], list[str]]) -> None:
         '''
@@ -171,7 +677,34 @@ class Table:
                 depend_list.append(index)
             
             self.funct_depends.append((determ_list, depend_list))
-            
+
+    def discover_functional_dependencies(self, max_lhs_size: 'int | None' = None) -> 'list[tuple[list[int], list[int]]]':
+        '''
+        This finds every minimal functional dependency that holds on the current tuples and returns them
+        in the same format as self.funct_depends, so the result can be assigned to it directly\n
+        If max_lhs_size is given, only determinants with at most that many attributes are searched for
+        '''
+        return fd_discovery.discover_functional_dependencies(self.get_column_values(), len(self.tuples), max_lhs_size)
+
+    def validate_dependencies(self, max_violations: 'int | None' = None) -> 'list[validator.Violation]':
+        '''
+        This checks that self.funct_depends and self.multi_funct_depends hold on the current tuples,
+        and returns a Violation for every group of tuples that breaks one (an empty list means everything holds)\n
+        Stops after max_violations violations have been found, if it is given
+        '''
+        return validator.validate_dependencies(
+            self.get_column_values(), len(self.tuples), self.funct_depends, self.multi_funct_depends, max_violations
+        )
+
+    def get_column_values(self) -> 'list[Sequence[Hashable]]':
+        '''
+        This returns the values of the tuples column by column, for code that groups rows by the values in some columns\n
+        Columnar tables return their code arrays, which are equal exactly where the values are
+        '''
+        if self.store is not None:
+            return self.store.codes
+        return [[tup[col] for tup in self.tuple_list] for col in range(len(self.columns))]
+
     def get_determinants(self, dependant: int) -> list[list[int]]:
         '''
         This takes in a dependant (as an int) and outputs the determinants as a list of lists of ints\n
@@ -203,38 +736,38 @@ class Table:
         '''
         dependancies: list[tuple[list[int], list[int]]] = []
         # Get all non-primes
-        primes = self.get_primes()
-        candidate_keys = self.get_candidate_keys()
-        non_primes = list(range(len(self.columns)))
-        for attr in primes:
-            non_primes.remove(attr)
-            
-        # For each non-prime attribute, check if its determinant is a proper subset of the primary key
-        # TODO this can be done better by searching through FDs instead of non prime attributes? maybe not, but think on it
-        for attr in non_primes:
-            determinants = self.get_determinants(attr)
-            
-            #partial_determinant: list[int] = []
-            for key in candidate_keys:
-                for det in determinants:
-                    det_subset_key = all(attr in key for attr in det)
-                    if not det_subset_key:
-                        continue
-                    det_is_key = det == key
-                    if det_is_key:
-                        continue
-                    
-                    # If we get here, the determinant is a proper subset of some candidate key
-                    # Add the full dependency to the list of partial_dependencies
-                    dependants = self.get_dependants(det)
-                    dep: list[int] = []
-                    # Check if a dependant is a prime attribute and if it isnt, add it to the list of dependancies to add to the new FD
-                    for attr in dependants:
-                        if not (attr in primes):
-                            dep.append(attr)
-                    new_depend = (det, dep)
-                    if not (new_depend in dependancies):
-                        dependancies.append(new_depend)
+        primes = self.get_prime_bits()
+        candidate_keys = self.get_candidate_key_bits()
+        non_primes = full_bitset(len(self.columns)) & ~primes
+        
+        # Find every determinant that is a proper subset of some candidate key,
+        # along with all the non-prime attributes it describes (including transitively)
+        partial_determinants: 'list[tuple[list[int], AttributeSet, AttributeSet]]' = []
+        for det, dep in self.funct_depends:
+            det_bits = to_bitset(det)
+            if any(det_bits == partial_det for _, partial_det, _ in partial_determinants):
+                continue
+            det_is_partial = any(is_subset(det_bits, key) and det_bits != key for key in candidate_keys)
+            if not det_is_partial:
+                continue
+            partial_determinants.append((det, det_bits, self.closure_bits(det_bits) & non_primes))
+        
+        # If a smaller partial determinant describes an attribute, the attribute goes with that one instead
+        trimmed_determinants: 'list[tuple[list[int], AttributeSet]]' = []
+        for det, det_bits, dependants in partial_determinants:
+            for _, other_det_bits, other_dependants in partial_determinants:
+                if other_det_bits != det_bits and is_subset(other_det_bits, det_bits):
+                    dependants &= ~other_dependants
+            trimmed_determinants.append((det, dependants))
+        
+        # For each non-prime attribute, add the partial dependencies that describe it
+        for attr in from_bitset(non_primes):
+            for det, dependants in trimmed_determinants:
+                if not has_attribute(dependants, attr):
+                    continue
+                new_depend = (det, from_bitset(dependants))
+                if not (new_depend in dependancies):
+                    dependancies.append(new_depend)
                         
         return dependancies
     
@@ -246,16 +779,13 @@ class Table:
         '''
         dependancies: list[tuple[list[int], list[int]]] = []
         # Get all non-primes
-        primes = self.get_primes()
-        non_primes = list(range(len(self.columns)))
-        for attr in primes:
-            non_primes.remove(attr)
+        primes = self.get_prime_bits()
         
         # For all non-trivial FDs (explicitly defined FDs), check if the determinant is non-prime
         # We assume that all non-prime attributes are fully functionally dependant on primary key
         
         for det, dep in self.funct_depends:
-            det_is_non_prime = all(attr in non_primes for attr in det)
+            det_is_non_prime = to_bitset(det) & primes == 0
             
             if not det_is_non_prime:
                 continue
@@ -263,7 +793,7 @@ class Table:
             # If an attribute in the dependants is non-prime, we add it to the list of dependants
             dependant: list[int] = []
             for attr in dep:
-                if not (attr in primes):
+                if not has_attribute(primes, attr):
                     dependant.append(attr)
             if len(dependant) == 0:
                 continue
@@ -279,9 +809,8 @@ class Table:
         '''
         dependancies: list[tuple[list[int], list[int]]] = []
         # We need to check, for each functional dependency in the table, if the determinant is a superkey
-        super_keys = self.get_superkeys()
         for det, dep in self.funct_depends:
-            det_is_superkey = det in super_keys
+            det_is_superkey = self.check_if_superkey_bits(to_bitset(det))
             if not det_is_superkey:
                 new_depend = (det, dep)
                 dependancies.append(new_depend)
@@ -323,42 +852,123 @@ class Table:
             raise RuntimeError(f"'{attr}' is not a valid attribute")
     
     def add_tuple(self, tuple: tuple[str]) -> None:
+        '''
+        This adds a tuple to the end of the table\n
+        Raises a RuntimeError if the primary key index is in use and a tuple with the same PK values is already in the table
+        '''
         if len(tuple) != len(self.columns):
             raise RuntimeError(f"{tuple} values dont line up with {self.columns}")
-        self.tuples.append(tuple)
+        pk_index = self.get_active_pk_index()
+        if pk_index is not None:
+            pk_values = self.get_pk_values(tuple)
+            if pk_values in pk_index:
+                raise RuntimeError(f"A tuple with PK {pk_values} is already in the table")
+            pk_index[pk_values] = len(self.tuples)
+        if self.store is not None:
+            self.store.append(tuple)
+        else:
+            self.tuple_list.append(tuple)
     
-    def add_tuples(self, tuples: list[tuple[str]]) -> None:
+    def add_tuples(self, tuples: 'Iterable[tuple[str]]') -> None:
         '''
-        This takes in a list of tuples and adds them to the tuple list
+        This takes in a list (or any iterable) of tuples and adds them to the tuple list
         '''
         for tuple in tuples:
             self.add_tuple(tuple)
     
-    def remove_tuple(self, primary_key: tuple) -> None:
+    def get_pk_values(self, tup: tuple[str]) -> tuple:
         '''
-        Takes in a tuple of the PK values of the specific tuple to remove.\n
-        Make sure the order of these values match the order of the attributes you entered to set the PK\n
-        Raises a runtime error if no tuple is found or if more than one tuple is found
-        To keep it simple, enter these in the order they appear in the table <----!!!!
+        This returns the values of the primary key attributes in a tuple, in the order of self.primary_key
+        '''
+        return tuple(tup[i] for i in self.primary_key)
+    
+    def get_active_pk_index(self) -> 'dict[tuple, int] | None':
+        '''
+        This returns the primary key index if it has been built and is still up to date, otherwise None
+        '''
+        if self.pk_index is not None and self.pk_index_version != self._primary_key.version[0]:
+            # The primary key was edited in place, so the index is keyed on the wrong values
+            self.pk_index = None
+        return self.pk_index
+    
+    def get_pk_index(self) -> dict[tuple, int]:
+        '''
+        This returns a dict mapping the PK values of every tuple to its position in self.tuples\n
+        The index is built the first time this is called, and kept up to date by add_tuple, remove_tuple and update_tuple after that\n
+        Raises a RuntimeError if two tuples share the same PK values
+        '''
+        pk_index = self.get_active_pk_index()
+        if pk_index is not None:
+            return pk_index
+        pk_index = {}
+        for position, tup in enumerate(self.tuples):
+            pk_values = self.get_pk_values(tup)
+            if pk_values in pk_index:
+                raise RuntimeError(f"PK {pk_values} does not uniquely describe tuple, returned {[self.tuples[pk_index[pk_values]], tup]}")
+            pk_index[pk_values] = position
+        self.pk_index = pk_index
+        self.pk_index_version = self._primary_key.version[0]
+        return pk_index
+    
+    def find_tuple_position(self, primary_key: tuple) -> int:
+        '''
+        Takes in a tuple of the PK values of a specific tuple and returns its position in self.tuples\n
+        Raises a RuntimeError if no tuple is found
         '''
-        tuples_to_search = self.tuples.copy()
-        # TODO make sure that the PK values are entered in the order they appear in the column list (just sort them)
         if len(primary_key) != len(self.primary_key):
             raise RuntimeError(f"{primary_key} values dont line up with {self.primary_key}")
-        # For each primary key value
-        for i in range(len(primary_key)):
-            matching_tuples = []
-            pk_index = self.primary_key[i]
-            # For each tuple in the list of tuples
-            for tuple in tuples_to_search:
-                if tuple[pk_index] == primary_key[i]: 
-                    matching_tuples.append(tuple)
-            tuples_to_search = matching_tuples.copy()
-        if len(tuples_to_search) == 0:
+        position = self.get_pk_index().get(tuple(primary_key))
+        if position is None:
             raise RuntimeError(f"No tuple found with PK {primary_key}")
-        if len(tuples_to_search) != 1:
-            raise RuntimeError(f"PK {primary_key} does not uniquely describe tuple, returned {tuples_to_search}")
-        self.tuples.remove(tuples_to_search[0])
+        return position
+    
+    def get_tuple(self, primary_key: tuple) -> tuple[str]:
+        '''
+        Takes in a tuple of the PK values of a specific tuple and returns the tuple.\n
+        Make sure the order of these values match the order of the attributes you entered to set the PK\n
+        Raises a RuntimeError if no tuple is found
+        '''
+        return self.tuples[self.find_tuple_position(primary_key)]
+    
+    def update_tuple(self, primary_key: tuple, new_tuple: tuple[str]) -> None:
+        '''
+        Takes in a tuple of the PK values of a specific tuple and replaces that tuple with new_tuple.\n
+        Make sure the order of these values match the order of the attributes you entered to set the PK\n
+        Raises a RuntimeError if no tuple is found, or if new_tuple has the PK values of a different tuple
+        '''
+        if len(new_tuple) != len(self.columns):
+            raise RuntimeError(f"{new_tuple} values dont line up with {self.columns}")
+        position = self.find_tuple_position(primary_key)
+        pk_index = self.get_pk_index()
+        new_pk_values = self.get_pk_values(new_tuple)
+        if new_pk_values != tuple(primary_key):
+            if new_pk_values in pk_index:
+                raise RuntimeError(f"A tuple with PK {new_pk_values} is already in the table")
+            del pk_index[tuple(primary_key)]
+            pk_index[new_pk_values] = position
+        if self.store is not None:
+            self.store.set_row(position, new_tuple)
+        else:
+            self.tuple_list[position] = new_tuple
+    
+    def remove_tuple(self, primary_key: tuple) -> None:
+        '''
+        Takes in a tuple of the PK values of the specific tuple to remove.\n
+        Make sure the order of these values match the order of the attributes you entered to set the PK\n
+        Raises a runtime error if no tuple is found or if more than one tuple is found\n
+        Note: to make this O(1), the last tuple in the table is moved into the spot of the removed one
+        '''
+        position = self.find_tuple_position(primary_key)
+        pk_index = self.get_pk_index()
+        del pk_index[tuple(primary_key)]
+        last_position = len(self.tuples) - 1
+        if position != last_position:
+            pk_index[self.get_pk_values(self.tuples[last_position])] = position
+        if self.store is not None:
+            self.store.swap_remove(position)
+        else:
+            self.tuple_list[position] = self.tuple_list[last_position]
+            self.tuple_list.pop()
     
     def get_columns(self, indexes: list[int]) -> str:
         '''
@@ -375,12 +985,12 @@ class Table:
         
         return string
     
-    def print_table(self) -> None:
+    def print_table(self, mode: str = "all", limit: int = 20) -> None:
         '''
-        This will print the table data formatted with tabulate
+        This will print the table data as a grid, streaming it out one row at a time\n
+        mode is "all", "head", "tail" or "sample", every mode but "all" only prints limit rows (see renderer.py)
         '''
-        formatted_table = tabulate(self.tuples, headers=self.columns)
-        print(formatted_table)
+        renderer.render_table(self.columns, self.tuples, mode, limit)
     
     def print_primary_key(self) -> None:
         '''
@@ -0,0 +1,32 @@
+import io
+from contextlib import redirect_stdout
+
+import main
+import table
+
+def get_check_output(my_table: table.Table) -> str:
+    output = io.StringIO()
+    with redirect_stdout(output):
+        main.check_dependencies(my_table)
+    return output.getvalue()
+
+def test_check_dependencies_splits_multivalued_cells():
+    # Dr.Watson only has one row, so the FD only breaks once the multivalued email cell is split up
+    my_table = table.Table(
+        ["Professor", "ProfessorEmail"],
+        [("Dr.Smith", "smith@mst.edu"), ("Dr.Watson", "watson@mst.edu watbro@mst.edu")]
+    )
+    my_table.set_functional_dependencies((["Professor"], ["ProfessorEmail"]))
+    output = get_check_output(my_table)
+    assert "Professor -> ProfessorEmail" in output
+    assert "('Dr.Watson', 'watson@mst.edu')" in output
+    assert "('Dr.Watson', 'watbro@mst.edu')" in output
+    assert "Dr.Smith" not in output
+
+def test_check_dependencies_prints_nothing_when_they_hold():
+    my_table = table.Table(
+        ["Professor", "ProfessorEmail"],
+        [("Dr.Smith", "smith@mst.edu"), ("Dr.Watson", "watson@mst.edu")]
+    )
+    my_table.set_functional_dependencies((["Professor"], ["ProfessorEmail"]))
+    assert get_check_output(my_table) == ""
@@ -0,0 +1,151 @@
+'''
+Checks that declared functional and multivalue functional dependencies actually hold on the data in a table\n
+Every FD determinant gets one pass over the rows that groups them by their determinant values in a dict,
+and MVDs are checked by counting, per determinant group, the distinct dependant values, the distinct values of the
+rest of the row, and the distinct pairs of the two (the MVD holds exactly when the pairs are every combination)
+'''
+from itertools import repeat
+from typing import Hashable, Iterator, Sequence
+
+class Violation:
+    '''
+    One group of rows that breaks a dependency\n
+    kind is "FD" or "MVD", determinant and dependant are attribute indexes like in Table.funct_depends,
+    and rows are the positions of the offending rows in Table.tuples
+    '''
+
+    def __init__(self, kind: str, determinant: list[int], dependant: list[int], rows: list[int]):
+        self.kind = kind
+        self.determinant = determinant
+        self.dependant = dependant
+        self.rows = rows
+
+    def __repr__(self) -> str:
+        arrow = "->" if self.kind == "FD" else "->->"
+        return f"Violation({self.determinant} {arrow} {self.dependant}, rows={self.rows})"
+
+def iter_row_values(columns: 'list[Sequence[Hashable]]', indexes: list[int], row_count: int) -> 'Iterator[tuple]':
+    '''
+    This yields, for every row, a tuple of its values in the given columns
+    '''
+    if len(indexes) == 0:
+        return repeat((), row_count)
+    return zip(*(columns[i] for i in indexes))
+
+def group_funct_depends(funct_depends: 'list[tuple[list[int], list[int]]]') -> dict[tuple[int, ...], list[int]]:
+    '''
+    This merges the dependants of every FD with the same determinant, so each determinant only needs one pass over the rows\n
+    Dependants that are part of their own determinant are dropped, since they always hold
+    '''
+    grouped: dict[tuple[int, ...], list[int]] = {}
+    for det, dep in funct_depends:
+        key = tuple(sorted(set(det)))
+        dependants = grouped.setdefault(key, [])
+        for attr in dep:
+            if attr not in key and attr not in dependants:
+                dependants.append(attr)
+    return grouped
+
+def validate_funct_depends(
+    columns: 'list[Sequence[Hashable]]',
+    row_count: int,
+    funct_depends: 'list[tuple[list[int], list[int]]]',
+    max_violations: 'int | None' = None
+    ) -> list[Violation]:
+    '''
+    This returns a Violation for every group of rows that agree on the determinant of an FD but not on its dependants\n
+    The rows of a violation are the first row of the group followed by every row that disagrees with it\n
+    Stops after max_violations violations have been found, if it is given
+    '''
+    violations: list[Violation] = []
+    for det, dep in group_funct_depends(funct_depends).items():
+        if len(dep) == 0:
+            continue
+        # The first dependant values and row seen for each determinant value
+        first_seen: dict[tuple, tuple[tuple, int]] = {}
+        found: dict[tuple, Violation] = {}
+        det_values = iter_row_values(columns, list(det), row_count)
+        dep_values = iter_row_values(columns, dep, row_count)
+        for row, (key, value) in enumerate(zip(det_values, dep_values)):
+            first_value, first_row = first_seen.setdefault(key, (value, row))
+            if first_value == value:
+                continue
+            violation = found.get(key)
+            if violation is None:
+                if max_violations is not None and len(violations) >= max_violations:
+                    return violations
+                violation = Violation("FD", list(det), dep, [first_row])
+                found[key] = violation
+                violations.append(violation)
+            violation.rows.append(row)
+    return violations
+
+def validate_multi_funct_depends(
+    columns: 'list[Sequence[Hashable]]',
+    row_count: int,
+    multi_funct_depends: 'list[tuple[int, int]]',
+    max_violations: 'int | None' = None
+    ) -> list[Violation]:
+    '''
+    This returns a Violation for every determinant group of rows that an MVD does not hold on\n
+    X ->-> Y holds on a group when every Y value in it shows up with every value of the rest of the row (Z),
+    which we check by seeing if the number of distinct (Y, Z) pairs is the number of Y values times the number of Z values\n
+    Stops after max_violations violations have been found, if it is given
+    '''
+    violations: list[Violation] = []
+    width = len(columns)
+    for det, dep in multi_funct_depends:
+        if det == dep:
+            continue
+        rest = [i for i in range(width) if i != det and i != dep]
+        # For each determinant value: the distinct Y values, the distinct Z values and the distinct (Y, Z) pairs
+        groups: dict[Hashable, tuple[set, set, set]] = {}
+        for det_value, dep_value, rest_value in zip(columns[det], columns[dep], iter_row_values(columns, rest, row_count)):
+            group = groups.get(det_value)
+            if group is None:
+                group = (set(), set(), set())
+                groups[det_value] = group
+            group[0].add(dep_value)
+            group[1].add(rest_value)
+            group[2].add((dep_value, rest_value))
+
+        bad_values = {
+            det_value for det_value, (dep_set, rest_set, pairs) in groups.items()
+            if len(pairs) != len(dep_set) * len(rest_set)
+        }
+        if len(bad_values) == 0:
+            continue
+        # Only the groups that failed need their rows, so we find them with a second pass instead of storing every row
+        found: dict[Hashable, Violation] = {}
+        for row, det_value in enumerate(columns[det]):
+            if det_value not in bad_values:
+                continue
+            violation = found.get(det_value)
+            if violation is None:
+                if max_violations is not None and len(violations) >= max_violations:
+                    return violations
+                violation = Violation("MVD", [det], [dep], [])
+                found[det_value] = violation
+                violations.append(violation)
+            violation.rows.append(row)
+    return violations
+
+def validate_dependencies(
+    columns: 'list[Sequence[Hashable]]',
+    row_count: int,
+    funct_depends: 'list[tuple[list[int], list[int]]]',
+    multi_funct_depends: 'list[tuple[int, int]]',
+    max_violations: 'int | None' = None
+    ) -> list[Violation]:
+    '''
+    This takes in the values of a table column by column and its declared dependencies,
+    and returns the violations of the FDs followed by the violations of the MVDs\n
+    Stops after max_violations violations have been found in total, if it is given
+    '''
+    violations = validate_funct_depends(columns, row_count, funct_depends, max_violations)
+    if max_violations is not None:
+        max_violations -= len(violations)
+        if max_violations <= 0:
+            return violations
+    violations += validate_multi_funct_depends(columns, row_count, multi_funct_depends, max_violations)
+    return violations
@@ -0,0 +1,200 @@
+'''
+Schema level checks on the tables a table was decomposed into, done with the dependencies alone and never the rows\n
+The lossless join check uses the chase: a tableau with one row per decomposed table, where every attribute the table
+has gets the distinguished symbol for its column and every other attribute gets a symbol of its own.
+The dependencies then equate symbols (FDs) or add rows (MVDs) until nothing changes,
+and the decomposition is lossless exactly when some row ends up all distinguished\n
+The dependency preservation check uses the restricted closure algorithm, which is polynomial in the number of columns and FDs
+'''
+import table
+from bitset import AttributeSet, to_bitset, is_subset
+
+def get_table_attributes(original: table.Table, tables: list[table.Table]) -> list[list[int]]:
+    '''
+    This returns the columns of each decomposed table as indexes into the columns of the original table\n
+    Raises a RuntimeError if a table has a column the original does not
+    '''
+    table_attributes: list[list[int]] = []
+    for my_table in tables:
+        attributes: list[int] = []
+        for col in my_table.columns:
+            original.check_attribute_if_valid(col)
+            attributes.append(original.columns.index(col))
+        table_attributes.append(attributes)
+    return table_attributes
+
+class Tableau:
+    '''
+    The tableau used by the chase\n
+    Symbols are ints, the distinguished symbol of column c is c itself and every other symbol is bigger than any column,
+    equated symbols are tracked with a union find so equating them is near O(1)
+    '''
+
+    def __init__(self, width: int, table_attributes: list[list[int]]):
+        self.width = width
+        self.parent: list[int] = list(range(width))
+        self.rows: list[list[int]] = []
+        for attributes in table_attributes:
+            row = [self.new_symbol() for _ in range(width)]
+            for attr in attributes:
+                row[attr] = attr
+            self.rows.append(row)
+
+    def new_symbol(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, symbol: int) -> int:
+        '''
+        This returns the symbol every symbol equated to this one has been replaced with
+        '''
+        root = symbol
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Point everything on the path straight at the root, so the next find is quicker
+        while self.parent[symbol] != root:
+            self.parent[symbol], symbol = root, self.parent[symbol]
+        return root
+
+    def equate(self, first: int, second: int) -> bool:
+        '''
+        This makes two symbols the same, keeping the distinguished one if there is one\n
+        Returns True if they were not already the same
+        '''
+        first = self.find(first)
+        second = self.find(second)
+        if first == second:
+            return False
+        # Distinguished symbols are the smallest ones, so keeping the smaller root keeps them
+        if second < first:
+            first, second = second, first
+        self.parent[second] = first
+        return True
+
+    def get_row(self, index: int) -> tuple[int, ...]:
+        '''
+        This returns a row of the tableau with every symbol replaced by what it was equated to
+        '''
+        return tuple(self.find(symbol) for symbol in self.rows[index])
+
+    def has_distinguished_row(self) -> bool:
+        '''
+        This returns True if some row has the distinguished symbol in every column
+        '''
+        return any(
+            all(self.find(symbol) == col for col, symbol in enumerate(row))
+            for row in self.rows
+        )
+
+    def apply_funct_depend(self, determinant: list[int], dependant: list[int]) -> bool:
+        '''
+        This equates the dependant symbols of every pair of rows that agree on the determinant\n
+        Rows are grouped by their determinant symbols in a dict, so this is one pass over the rows\n
+        Returns True if anything changed
+        '''
+        changed = False
+        first_rows: dict[tuple[int, ...], list[int]] = {}
+        for row in self.rows:
+            key = tuple(self.find(row[attr]) for attr in determinant)
+            first_row = first_rows.setdefault(key, row)
+            if first_row is row:
+                continue
+            for attr in dependant:
+                if self.equate(first_row[attr], row[attr]):
+                    changed = True
+        return changed
+
+    def apply_multi_funct_depend(self, determinant: int, dependant: int) -> bool:
+        '''
+        For every pair of rows t1 and t2 that agree on the determinant, this adds the row
+        with the determinant and dependant of t1 and everything else from t2, if it is not already there\n
+        Returns True if any rows were added
+        '''
+        groups: dict[int, list[tuple[int, ...]]] = {}
+        existing: set[tuple[int, ...]] = set()
+        for index in range(len(self.rows)):
+            row = self.get_row(index)
+            if row in existing:
+                continue
+            existing.add(row)
+            groups.setdefault(row[determinant], []).append(row)
+
+        changed = False
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            for first in group:
+                for second in group:
+                    new_row = list(second)
+                    new_row[dependant] = first[dependant]
+                    new_row = tuple(new_row)
+                    if new_row in existing:
+                        continue
+                    existing.add(new_row)
+                    self.rows.append(list(new_row))
+                    changed = True
+        return changed
+
+def is_lossless_join(original: table.Table, tables: list[table.Table]) -> bool:
+    '''
+    This takes in a table and the tables it was decomposed into, and returns True if joining the decomposed tables
+    back together always gives the original table back, going by the FDs and MVDs of the original table\n
+    The tables are matched up with the original by column name
+    '''
+    width = len(original.columns)
+    table_attributes = get_table_attributes(original, tables)
+    tableau = Tableau(width, table_attributes)
+    funct_depends = [(list(det), list(dep)) for det, dep in original.funct_depends]
+    multi_funct_depends = [(det, dep) for det, dep in original.multi_funct_depends if det != dep]
+
+    changed = True
+    while changed:
+        if tableau.has_distinguished_row():
+            return True
+        changed = False
+        # FDs only equate symbols, so we run them all to a fixpoint before any MVD adds rows
+        for det, dep in funct_depends:
+            if tableau.apply_funct_depend(det, dep):
+                changed = True
+        if changed:
+            continue
+        for det, dep in multi_funct_depends:
+            if tableau.apply_multi_funct_depend(det, dep):
+                changed = True
+    return tableau.has_distinguished_row()
+
+def is_dependency_preserved(original: table.Table, table_bits: 'list[AttributeSet]', funct_depend: tuple[list[int], list[int]]) -> bool:
+    '''
+    This returns True if the FD follows from the FDs that hold inside the decomposed tables (given as column bitmasks)\n
+    We grow the determinant with the restricted closure: for each table, whatever the part of it we already have
+    describes inside of that table is added, until nothing changes. This never has to work out the projected FDs
+    '''
+    dependant = to_bitset(funct_depend[1])
+    attributes = to_bitset(funct_depend[0])
+    changed = True
+    while changed and not is_subset(dependant, attributes):
+        changed = False
+        for bits in table_bits:
+            new_attributes = attributes | (original.closure_bits(attributes & bits) & bits)
+            if new_attributes != attributes:
+                attributes = new_attributes
+                changed = True
+    return is_subset(dependant, attributes)
+
+def get_unpreserved_dependencies(
+    original: table.Table, 
+    tables: list[table.Table], 
+    funct_depends: 'list[tuple[list[int], list[int]]] | None' = None
+    ) -> list[tuple[list[int], list[int]]]:
+    '''
+    This takes in a table and the tables it was decomposed into, and returns the FDs that can no longer be enforced
+    by only looking inside the decomposed tables one at a time\n
+    funct_depends are the FDs to check, in terms of the original columns, and default to the FDs of the original table
+    '''
+    if funct_depends is None:
+        funct_depends = original.funct_depends
+    table_bits = [to_bitset(attributes) for attributes in get_table_attributes(original, tables)]
+    return [
+        (list(det), list(dep)) for det, dep in funct_depends
+        if not is_dependency_preserved(original, table_bits, (det, dep))
+    ]